@@ -0,0 +1,69 @@
+"""Statewide per-year statistics for the metrics the dashboard plots.
+
+None of these depend on the selected county, so they are computed once when the
+data is loaded, for every metric the chart specs plot (dataset.py), and the
+callbacks only look up the rows they need.
+"""
+import numpy as np
+import pandas as pd
+
+# Column used to weight the enrollment-weighted mean
+WEIGHT_COLUMN = 'Public School Final Enrollment'
+
+# Statistics stored for every metric
+STATS = ['mean', 'weighted_mean', 'median', 'p10', 'p90']
+
+# Metric -> column whose finite, non-negative values select the rows that feed its
+# statistics, where that isn't the metric itself. The funding charts only ever averaged
+# years with a usable local funding share (a zero or missing total expenditure makes
+# the share infinite).
+BASIS_COLUMNS = {
+    'local_expenditure_per_pupil': 'local_funding_as_perc',
+}
+
+
+def valid_rows(values):
+    """Mask of finite, non-negative values."""
+    values = values.to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return np.isfinite(values) & (values >= 0)
+
+
+def statewide_by_year(df, metrics):
+    """Return per-year statistics of ``metrics`` across all rows of ``df``.
+
+    The result is indexed by year with (metric, stat) columns. Years in which a
+    metric has no usable rows are NaN for that metric.
+    """
+    metrics = {metric: BASIS_COLUMNS.get(metric, metric) for metric in metrics if metric in df.columns}
+
+    # Mask every metric down to the finite values in rows its basis column allows, in one frame
+    masks = {basis: valid_rows(df[basis]) for basis in set(metrics.values())}
+    values = {}
+    for metric, basis in metrics.items():
+        column = df[metric].to_numpy(dtype='float64', na_value=np.nan)
+        values[metric] = np.where(masks[basis] & np.isfinite(column), column, np.nan)
+    values = pd.DataFrame(values, index=df.index)
+
+    grouped = values.groupby(df['year'])
+    weights = df[WEIGHT_COLUMN].to_numpy(dtype='float64', na_value=np.nan)
+    weights = np.where(np.isfinite(weights) & (weights > 0), weights, np.nan)
+    weighted = values.mul(weights, axis=0)
+    weight_totals = values.notna().mul(np.nan_to_num(weights), axis=0)
+    weight_totals = weight_totals.where(weighted.notna(), 0)
+
+    stats = {
+        'mean': grouped.mean(),
+        'weighted_mean': weighted.groupby(df['year']).sum(min_count=1) / weight_totals.groupby(df['year']).sum(),
+        'median': grouped.median(),
+        'p10': grouped.quantile(0.1),
+        'p90': grouped.quantile(0.9),
+    }
+    table = pd.concat(stats, axis=1).swaplevel(axis=1)
+    return table[[(metric, stat) for metric in metrics for stat in STATS]].sort_index()
+
+
+def statewide_series(table, metric, stat='mean'):
+    """Return the (years, values) of one statistic, skipping years without data."""
+    series = table[(metric, stat)].dropna()
+    return series.index, series.to_numpy()
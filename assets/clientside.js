@@ -0,0 +1,87 @@
+// Client-side rendering mode (see clientside.py): builds the chart figures in
+// the browser from per-county series packed as base64 typed arrays.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        requestCounty: function (county, series) {
+            if (!county || (series && series[county])) {
+                return window.dash_clientside.no_update;
+            }
+            return county;
+        },
+
+        mergeSeries: function (payload, series) {
+            if (!payload) {
+                return window.dash_clientside.no_update;
+            }
+            var merged = Object.assign({}, series);
+            merged[payload.county] = payload;
+            return merged;
+        },
+
+        buildFigures: function (county, series, templates) {
+            var payload = series && series[county];
+            if (!payload || !templates) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var years = Array.from(decode(payload.years, Int16Array));
+            var values = decode(payload.series, Float64Array);
+            var length = payload.length;
+            var maxYear = Math.max.apply(null, years);
+            var offset = 0;
+
+            return templates.charts.map(function (template) {
+                var data = JSON.parse(JSON.stringify(template.data));
+                var parts = [];
+                template.roles.forEach(function (role, i) {
+                    if (role === 'series') {
+                        data[i].x = years;
+                        data[i].y = Array.from(values.subarray(offset, offset + length));
+                        parts.push(data[i].y);
+                        offset += length;
+                    }
+                });
+                if (template.percent) {
+                    var shares = percentShares(parts, template.percent === 'share_fill_zero');
+                    template.roles.forEach(function (role, i) {
+                        if (role === 'percent') {
+                            data[i].x = years;
+                            data[i].y = shares.shift();
+                        }
+                    });
+                }
+
+                var layout = JSON.parse(JSON.stringify(template.layout));
+                layout.template = templates.theme;
+                if (layout.xaxis && layout.xaxis.range) {
+                    layout.xaxis.range[1] = maxYear + 1;
+                }
+                return {data: data, layout: layout};
+            });
+        }
+    }
+});
+
+function decode(base64, ArrayType) {
+    var binary = atob(base64);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new ArrayType(bytes.buffer);
+}
+
+// Each part as a percentage of the sum of all parts, year by year
+function percentShares(parts, fillZero) {
+    var clean = function (value) {
+        return fillZero && isNaN(value) ? 0 : value;
+    };
+    var totals = parts[0].map(function (_, j) {
+        return parts.reduce(function (sum, part) { return sum + clean(part[j]); }, 0);
+    });
+    return parts.map(function (part) {
+        return part.map(function (value, j) {
+            var share = clean(value) / totals[j] * 100;
+            return isFinite(share) ? share : NaN;
+        });
+    });
+}
@@ -0,0 +1,119 @@
+"""Burst of identical chart requests on a cold instance, with and without single-flight.
+
+For each county, --clients threads ask for all of its tabs at the same moment,
+as when a shared link brings many visitors at once. The baseline is the figure
+cache as it was before single-flight (look up, compute on a miss, store), where
+every request that misses before the first computation finishes computes too;
+the other run uses FigureCache. A tab renders in well under a millisecond here,
+faster than a burst's threads get scheduled, so each run is repeated with every
+computation padded by --work-ms of CPU work to model slower figures or a
+throttled CPU. Then --processes forked processes run the padded burst against
+one shared cache directory and report how many computations they needed in all.
+
+Usage (from the repository root):
+    python -m benchmarks.burst [--clients 32] [--counties 10] [--work-ms 20] [--processes 4]
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import tempfile
+import threading
+import time
+
+import app
+import dataset
+from figure_cache import FigureCache
+
+
+def render(county, tab, work_ms):
+    """The live tab render, followed by ``work_ms`` of CPU work."""
+    figures = app.render_tab(county, tab)
+    end = time.thread_time() + work_ms / 1000
+    while time.thread_time() < end:
+        pass
+    return figures
+
+
+def unsynchronized_get(cache, key, compute):
+    """FigureCache.get before single-flight: nothing stops concurrent misses computing the same key."""
+    with cache.lock:
+        if key in cache.entries:
+            cache.counts['memory_hits'] += 1
+            return cache.entries[key]
+        cache.counts['misses'] += 1
+    value = compute()
+    with cache.lock:
+        cache.entries[key] = value
+    return value
+
+
+def burst(get, counties, clients, work_ms):
+    """Every client asks for every tab of each county at once; (cache stats, wall s, cpu s)."""
+    cache = FigureCache(dataset.figure_cache.version, directory='')
+    wall = cpu = 0.0
+    with concurrent.futures.ThreadPoolExecutor(clients) as pool:
+        for county in counties:
+            barrier = threading.Barrier(clients)
+
+            def client():
+                barrier.wait()
+                for tab in app.TAB_GRAPHS:
+                    get(cache, (county, tab), lambda: render(county, tab, work_ms))
+
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            for future in [pool.submit(client) for _ in range(clients)]:
+                future.result()
+            wall += time.perf_counter() - start_wall
+            cpu += time.process_time() - start_cpu
+    return cache.stats(), wall, cpu
+
+
+def process_burst(directory, counties, clients, work_ms):
+    """One process's burst against the shared store; returns its cache counters."""
+    cache = FigureCache(dataset.figure_cache.version, directory=directory)
+    with concurrent.futures.ThreadPoolExecutor(clients) as pool:
+        for county in counties:
+            for tab in app.TAB_GRAPHS:
+                key = (county, tab)
+                futures = [pool.submit(cache.get, key, lambda: render(county, tab, work_ms)) for _ in range(clients)]
+                for future in futures:
+                    future.result()
+    return cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32, help='simultaneous requests per county')
+    parser.add_argument('--counties', type=int, default=10, help='number of counties to run')
+    parser.add_argument('--work-ms', type=float, default=20, help='CPU work added to each computation')
+    parser.add_argument('--processes', type=int, default=4, help='worker processes sharing a cache directory')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+    figures = len(counties) * len(app.TAB_GRAPHS)
+
+    print(f'{len(counties)} counties x {len(app.TAB_GRAPHS)} tabs x {args.clients} simultaneous clients '
+          f'= {figures * args.clients} requests for {figures} figures')
+    print(f'{"work ms":>7} {"cache":<14} {"computed":>9} {"coalesced":>10} {"cpu s":>8} {"wall s":>8}')
+    for work_ms in [0, args.work_ms]:
+        results = {}
+        for name, get in [('unsynchronized', unsynchronized_get), ('single-flight', FigureCache.get)]:
+            stats, wall, cpu = burst(get, counties, args.clients, work_ms)
+            results[name] = cpu
+            print(f'{work_ms:7.0f} {name:<14} {stats["misses"]:9d} {stats["coalesced"]:10d} '
+                  f'{cpu:8.3f} {wall:8.3f}')
+        print(f'{"":7} single-flight uses {results["unsynchronized"] / results["single-flight"]:.1f}x less CPU')
+
+    # Across processes: one lock file per key in the shared store
+    with tempfile.TemporaryDirectory() as directory:
+        context = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(args.processes, mp_context=context) as pool:
+            results = list(pool.map(process_burst, *zip(*[(directory, counties, args.clients, args.work_ms)]
+                                                         * args.processes)))
+    misses = sum(result['misses'] for result in results)
+    disk_hits = sum(result['disk_hits'] for result in results)
+    print(f'{args.processes} processes sharing a cache directory: {misses} computed, '
+          f'{disk_hits} read from the store, for {figures} figures')
+
+
+if __name__ == '__main__':
+    main()
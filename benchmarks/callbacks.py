@@ -0,0 +1,116 @@
+"""Compare the all-tabs chart callback with the lazy per-tab callbacks.
+
+The per-tab figures are checked against a golden fixture, GOLDEN_PATH: the
+figures of the app's 16-output callback from before it was split into tabs,
+captured on the typed dataset for a dozen counties. They cover the largest and
+smallest districts, counties with gaps in their history, and names that differ
+only in case. Values must agree to float32 precision (the old code computed
+ratios from the typed float32 columns, derived.py computes them in float64).
+What the old app didn't draw is left out: the statewide 10th-90th percentile
+band and the rank notes. Then it reports the CPU time and serialized response
+size of a county switch for each approach.
+
+Usage (from the repository root):
+    python -m benchmarks.callbacks [--counties N]
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import time
+
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+from benchmarks.payload import decoded
+
+# County -> graph id -> figure of the all-tabs callback, as comparable() returns it
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'callbacks.json.gz')
+
+# Relative tolerance for figure values: float32 precision, with room for a few rounding steps
+VALUE_TOLERANCE = 1e-5
+
+
+def serialize(figures):
+    return to_json_plotly(list(figures))
+
+
+def load_golden(path=GOLDEN_PATH):
+    with gzip.open(path, 'rt') as f:
+        return json.load(f)
+
+
+def comparable(figures):
+    """Figures as plain JSON with typed arrays decoded, without the statewide band and rank notes."""
+    plain = decoded(json.loads(serialize(figures)))
+    for figure in plain:
+        # The band's two traces are the only ones without hover text
+        figure['data'] = [trace for trace in figure['data'] if trace.get('hoverinfo') != 'skip']
+        figure['layout'].pop('annotations', None)
+    return plain
+
+
+def matches(expected, actual):
+    """Equal structure and strings, numbers equal to VALUE_TOLERANCE."""
+    if isinstance(expected, dict):
+        return (isinstance(actual, dict) and expected.keys() == actual.keys()
+                and all(matches(expected[key], actual[key]) for key in expected))
+    if isinstance(expected, list):
+        return (isinstance(actual, list) and len(expected) == len(actual)
+                and all(matches(e, a) for e, a in zip(expected, actual)))
+    if isinstance(expected, float) and isinstance(actual, (int, float)) and not isinstance(actual, bool):
+        return math.isclose(expected, actual, rel_tol=VALUE_TOLERANCE, abs_tol=1e-12)
+    return expected == actual
+
+
+def check(golden):
+    """Raise unless every golden county's per-tab figures match the all-tabs callback's."""
+    for county, expected in golden.items():
+        figures = [figure for tab in app.TAB_GRAPHS for figure in app.tab_figures(county, tab)]
+        actual = dict(zip(app.ALL_GRAPHS, comparable(figures)))
+        if expected.keys() != actual.keys():
+            raise AssertionError(f'graph ids differ from the baseline callback for {county}')
+        for graph_id in expected:
+            if not matches(expected[graph_id], actual[graph_id]):
+                raise AssertionError(f'{graph_id} differs from the baseline callback for {county}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=len(dataset.counties), help='number of counties to time')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+
+    all_time = all_bytes = 0
+    tab_time = {tab: 0.0 for tab in app.TAB_GRAPHS}
+    tab_bytes = {tab: 0 for tab in app.TAB_GRAPHS}
+    for county in counties:
+        start = time.process_time()
+        figures = app.update_charts(county)
+        payload = serialize(figures)
+        all_time += time.process_time() - start
+        all_bytes += len(payload)
+
+        for tab in app.TAB_GRAPHS:
+            start = time.process_time()
+            tab_payload = serialize(app.tab_figures(county, tab))
+            tab_time[tab] += time.process_time() - start
+            tab_bytes[tab] += len(tab_payload)
+
+    golden = load_golden()
+    check(golden)
+    print(f'{len(golden)} counties, per-tab figures match the baseline all-tabs callback')
+    n = len(counties)
+    print(f'{"callback":<12} {"cpu ms":>8} {"kB":>8}')
+    print(f'{"all tabs":<12} {all_time / n * 1000:8.1f} {all_bytes / n / 1024:8.1f}')
+    for tab in app.TAB_GRAPHS:
+        print(f'{tab:<12} {tab_time[tab] / n * 1000:8.1f} {tab_bytes[tab] / n / 1024:8.1f}')
+    mean_time = sum(tab_time.values()) / len(tab_time)
+    mean_bytes = sum(tab_bytes.values()) / len(tab_bytes)
+    print(f'average tab: {all_time / mean_time:.1f}x less CPU, {all_bytes / mean_bytes:.1f}x fewer bytes per county switch')
+
+
+if __name__ == '__main__':
+    main()
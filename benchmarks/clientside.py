@@ -0,0 +1,38 @@
+"""Compare the client-side series payload with the server-rendered figures.
+
+Usage (from the repository root):
+    python -m benchmarks.clientside [--counties N]
+"""
+import argparse
+import json
+
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+import clientside
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=len(dataset.counties), help='number of counties to run')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+    graph_ids = [graph_id for graph_ids in app.TAB_GRAPHS.values() for graph_id in graph_ids]
+
+    templates = clientside.chart_templates(graph_ids, app.update_charts(counties[0]))
+    figure_bytes = payload_bytes = 0
+    for county in counties:
+        figures = app.update_charts(county)
+        figure_bytes += len(to_json_plotly(list(figures)))
+        payload_bytes += len(json.dumps(clientside.county_payload(graph_ids, figures, county)))
+
+    n = len(counties)
+    print(f'templates (sent once with the layout): {len(json.dumps(templates)) / 1024:8.1f} kB')
+    print(f'server-rendered figures per county:    {figure_bytes / n / 1024:8.1f} kB')
+    print(f'client-side series payload per county: {payload_bytes / n / 1024:8.1f} kB '
+          f'({figure_bytes / payload_bytes:.1f}x smaller, sent once per county per browser)')
+
+
+if __name__ == '__main__':
+    main()
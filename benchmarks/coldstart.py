@@ -0,0 +1,106 @@
+"""Time to first response of a fresh gunicorn instance, eager vs lazy startup.
+
+Starts gunicorn with one worker in each mode (DASHBOARD_LAZY=0/1) and measures,
+from process start, how long until the page answers, until the first chart
+callback answers and until /readyz reports every figure warmed up. Also profiles `python -X importtime -c "import app"` in lazy
+mode and checks that none of the data modules were imported. Exits non-zero if
+that check fails or the lazy time to first response is over --budget seconds.
+
+Usage (from the repository root):
+    python -m benchmarks.coldstart [--repeat 3] [--budget 2.0] [--port 8099]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.memory import CALLBACK_BODY
+
+# Modules lazy mode must not import before the first request that needs the data
+DEFERRED_MODULES = ['dataset', 'pandas', 'numpy', 'pyarrow', 'plotly.graph_objs._figure']
+
+
+def import_profile(lazy):
+    """(self us, cumulative us, module) of every import made by `import app`."""
+    env = dict(os.environ, DASHBOARD_LAZY='1' if lazy else '0')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    profile = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        profile.append((int(own), int(cumulative), name.strip()))
+    return profile
+
+
+def wait_for(url, start, deadline=120):
+    """Seconds from ``start`` until ``url`` answers."""
+    while time.perf_counter() - start < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+            return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError(f'{url} did not answer')
+
+
+def cold_start(lazy, port):
+    """(first response, first chart, ready) seconds for one fresh gunicorn instance."""
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server',
+               '--workers', '1', '--bind', f'127.0.0.1:{port}']
+    env = dict(os.environ, DASHBOARD_LAZY='1' if lazy else '0')
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}'
+        first_response = wait_for(url + '/', start)
+        request = urllib.request.Request(url + '/_dash-update-component', data=json.dumps(CALLBACK_BODY).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        urllib.request.urlopen(request, timeout=60).read()
+        first_chart = time.perf_counter() - start
+        # /readyz answers 503 (an HTTPError, so an OSError) until the warm-up is done
+        return first_response, first_chart, wait_for(url + '/readyz', start)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=2.0, help='lazy time to first response target, seconds')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    profile = import_profile(lazy=True)
+    imported = {name for _, _, name in profile}
+    print(f'import app (lazy): {max(cumulative for _, cumulative, _ in profile) / 1000:.0f} ms, slowest imports:')
+    for own, cumulative, name in sorted(profile, key=lambda entry: -entry[1])[:args.top]:
+        print(f'  {cumulative / 1000:8.1f} ms {name}')
+    failures = [f'lazy mode imported {name}' for name in DEFERRED_MODULES if name in imported]
+
+    print(f'{"mode":<6} {"first response":>15} {"first chart":>12} {"ready":>8}   '
+          f'(median of {args.repeat}, from process start)')
+    for lazy in [False, True]:
+        samples = [cold_start(lazy, args.port) for _ in range(args.repeat)]
+        first_response = statistics.median(sample[0] for sample in samples)
+        first_chart = statistics.median(sample[1] for sample in samples)
+        ready = statistics.median(sample[2] for sample in samples)
+        print(f'{"lazy" if lazy else "eager":<6} {first_response:14.2f}s {first_chart:11.2f}s {ready:7.2f}s')
+        if lazy and first_response > args.budget:
+            failures.append(f'lazy time to first response {first_response:.2f}s is over the {args.budget:.2f}s budget')
+
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Multi-county comparison: one gather over the metric cube vs one filtered view per county.
+
+For growing numbers of the largest counties it builds every tab's comparison
+figures both ways: from a single CountyGroupView (what the callback does) and,
+as the baseline, by filtering each county separately and building its own
+figures, as N single-county callbacks would. It checks that every county's
+overlaid traces hold the same values as its single-county figures, then reports
+build time, serialization time and response size per county count.
+
+Usage (from the repository root):
+    python -m benchmarks.compare [--counties 1,3,10,20] [--repeat 20]
+"""
+import argparse
+import time
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+from charts import series_metrics, typed_array_values
+
+
+def per_county(counties, tab):
+    """The baseline: each county filtered and its figures built on its own."""
+    return [dataset.chart_renderer.figures(app.TAB_GRAPHS[tab], app.filter_county(county)) for county in counties]
+
+
+def check(counties, tab, figures):
+    """Every county's overlaid traces match its single-county figure, year for year."""
+    for graph_id, figure in zip(app.TAB_GRAPHS[tab], figures):
+        n_metrics = len(series_metrics(dataset.chart_renderer.specs[graph_id]))
+        years = typed_array_values(figure['data'][0]['x'])
+        for j, county in enumerate(counties):
+            single = dataset.chart_renderer.figure(graph_id, app.filter_county(county))
+            for i in range(n_metrics):
+                overlaid = figure['data'][i * len(counties) + j]
+                expected = dict(zip(typed_array_values(single['data'][i]['x']),
+                                    typed_array_values(single['data'][i]['y'])))
+                values = typed_array_values(overlaid['y'])
+                shown = np.array([expected.get(year, np.nan) for year in years])
+                if not np.array_equal(values, shown, equal_nan=True):
+                    raise AssertionError(f'{graph_id}: {county} trace {i} differs from its single-county figure')
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', default='1,3,10,20', help='comma-separated numbers of counties to compare')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"counties":>8} {"per-county ms":>14} {"one gather ms":>14} {"serialize ms":>13} {"kB":>7}'
+          f'   (all tabs)')
+    for n in [int(n) for n in args.counties.split(',')]:
+        counties = dataset.counties_by_enrollment[:n]
+        baseline = gathered = serialize = size = 0.0
+        for tab in app.TAB_GRAPHS:
+            seconds, _ = timed(lambda: per_county(counties, tab), args.repeat)
+            baseline += seconds
+            seconds, figures = timed(lambda: app.compare_tab(counties, tab), args.repeat)
+            gathered += seconds
+            check(counties, tab, figures)
+            seconds, body = timed(lambda: to_json_plotly(list(figures)), args.repeat)
+            serialize += seconds
+            size += len(body)
+        print(f'{n:8d} {baseline * 1000:14.2f} {gathered * 1000:14.2f} {serialize * 1000:13.2f} {size / 1024:7.1f}')
+    print('overlaid traces match the single-county figures')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare county filter + series lookup: boolean-mask pandas path vs the metric cube.
+
+Usage (from the repository root):
+    python -m benchmarks.cube [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+import dataset
+
+
+def pandas_path(county):
+    df = dataset.df
+    filtered = df[(df['area_name'] == county) & (df['year'] >= dataset.FIRST_YEAR) & (df['year'] <= dataset.LAST_YEAR)]
+    return [filtered[col] for col in dataset.CHART_COLUMNS]
+
+
+def cube_path(county):
+    view = dataset.metric_cube.county(county)
+    return [view[col] for col in dataset.CHART_COLUMNS]
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        for county in dataset.counties:
+            start = time.perf_counter()
+            func(county)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Both paths must return the same values
+    for county in dataset.counties:
+        for expected, actual in zip(pandas_path(county), cube_path(county)):
+            np.testing.assert_array_equal(expected.to_numpy(dtype='float64'), actual)
+
+    pandas_time = timed(pandas_path, args.repeat)
+    cube_time = timed(cube_path, args.repeat)
+    print(f'{len(dataset.CHART_COLUMNS)} series per county, median over {len(dataset.counties)} counties')
+    print(f'pandas filter + select: {pandas_time * 1e6:9.1f} us')
+    print(f'metric cube views:      {cube_time * 1e6:9.1f} us ({pandas_time / cube_time:.0f}x faster)')
+    print(f'cube size: {dataset.metric_cube.values.nbytes / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare figure construction through plotly.graph_objs with the template dict path.
+
+For every county and chart this checks that the dict figure serializes to the
+same JSON as the validated go.Figure, then reports the median construction
+time per chart for both paths.
+
+Usage (from the repository root):
+    python -m benchmarks.figures [--counties N]
+"""
+import argparse
+import json
+import statistics
+import time
+
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+
+
+def timed(build, graph_id, views):
+    samples = []
+    for view in views:
+        start = time.perf_counter()
+        build(graph_id, view)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=len(dataset.counties), help='number of counties to run')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+    renderer = dataset.chart_renderer
+    views = [app.filter_county(county) for county in counties]
+
+    # Golden check: the dict path must match the go.Figure JSON exactly
+    for county, view in zip(counties, views):
+        for graph_id in app.ALL_GRAPHS:
+            expected = json.loads(pio.to_json(renderer.graph_object(graph_id, view)))
+            actual = json.loads(to_json_plotly(renderer.figure(graph_id, view)))
+            if actual != expected:
+                raise AssertionError(f'{graph_id} differs from the go.Figure output for {county}')
+
+    print(f'{len(counties)} counties, dict figures identical to go.Figure JSON')
+    print(f'{"chart":<44} {"go ms":>8} {"dict ms":>8}')
+    go_total = dict_total = 0
+    for graph_id in app.ALL_GRAPHS:
+        go_time = timed(renderer.graph_object, graph_id, views)
+        dict_time = timed(renderer.figure, graph_id, views)
+        go_total += go_time
+        dict_total += dict_time
+        print(f'{graph_id:<44} {go_time * 1000:8.2f} {dict_time * 1000:8.3f}')
+    print(f'{"all charts":<44} {go_total * 1000:8.2f} {dict_total * 1000:8.3f} '
+          f'({go_total / dict_total:.0f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
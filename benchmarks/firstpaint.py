@@ -0,0 +1,92 @@
+"""Requests and server time before the first chart is drawn, with figures in the layout vs a callback.
+
+For each of --counties deep links (?county=<name>) it requests the layout the
+way dash-renderer does (the page URL in the Referer header), checks that it
+opens on that county with the first tab's figures equal to what the chart
+callback returns, and times it. The baseline is the page as it was before the
+layout carried figures: the layout without them (timed as serialization only,
+which flatters it slightly), then the chart callback's round trip. Times are
+server-side through the Flask test client with the figure cache warm; the
+request saved also saves a network round trip, which these times leave out.
+
+Usage (from the repository root):
+    python -m benchmarks.firstpaint [--counties 20] [--repeat 5]
+"""
+import argparse
+import copy
+import json
+import statistics
+import time
+from urllib.parse import quote
+
+from dash._utils import to_json
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+from benchmarks.memory import CALLBACK_BODY
+
+
+def timed(function, repeat):
+    """(median seconds, result) of ``function()``."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def find(component, component_id):
+    """The props of the component with ``component_id`` in a serialized layout."""
+    if isinstance(component, dict):
+        if component.get('props', {}).get('id') == component_id:
+            return component['props']
+        component = list(component.values())
+    if isinstance(component, list):
+        for item in component:
+            found = find(item, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=20, help='number of deep links to request')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    client = app.app.server.test_client()
+    bare_layout = to_json(app.page_layout(dataset.counties))
+
+    before = after = before_bytes = after_bytes = 0.0
+    counties = dataset.counties[:args.counties]
+    for county in counties:
+        headers = {'Referer': f'http://localhost/?county={quote(county)}'}
+        seconds, response = timed(lambda: client.get('/_dash-layout', headers=headers), args.repeat)
+        layout = json.loads(response.data)
+        if find(layout, 'county-dropdown')['value'] != county:
+            raise AssertionError(f'?county={county} did not open on {county}')
+        expected = json.loads(to_json_plotly(app.update_tab(county, app.INITIAL_TAB, [], None, tab=app.INITIAL_TAB)))
+        shown = [find(layout, graph_id)['figure'] for graph_id in app.TAB_GRAPHS[app.INITIAL_TAB]]
+        if shown + [find(layout, f'{app.INITIAL_TAB}-rendered')['data']] != expected:
+            raise AssertionError(f'layout figures for {county} differ from the callback')
+        after += seconds
+        after_bytes += len(response.data)
+
+        body = copy.deepcopy(CALLBACK_BODY)
+        body['inputs'][0]['value'] = county
+        layout_seconds, _ = timed(lambda: to_json(app.page_layout(dataset.counties)), args.repeat)
+        callback_seconds, response = timed(lambda: client.post('/_dash-update-component', json=body), args.repeat)
+        before += layout_seconds + callback_seconds
+        before_bytes += len(bare_layout) + len(response.data)
+
+    n = len(counties)
+    print(f'{n} deep links open on their county with the callback\'s figures')
+    print(f'{"first paint":<22} {"requests":>9} {"server ms":>10} {"kB":>7}')
+    print(f'{"layout, then callback":<22} {2:9d} {before / n * 1000:10.2f} {before_bytes / n / 1024:7.1f}')
+    print(f'{"figures in layout":<22} {1:9d} {after / n * 1000:10.2f} {after_bytes / n / 1024:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
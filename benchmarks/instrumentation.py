@@ -0,0 +1,84 @@
+"""Cost of the /metrics instrumentation on the chart callback, recording on vs off.
+
+Posts a county switch for --counties counties through the Flask test client
+with recording off and on (alternating rounds, figure cache warm), reports the
+median request time of each and the cost of one timed block, then scrapes
+/metrics and checks every histogram is well formed: cumulative buckets that
+never decrease and a +Inf bucket equal to the count.
+
+Usage (from the repository root):
+    python -m benchmarks.instrumentation [--counties 20] [--rounds 5]
+"""
+import argparse
+import collections
+import copy
+import re
+import statistics
+import time
+
+import app
+import dataset
+import metrics
+from benchmarks.memory import CALLBACK_BODY
+
+SAMPLE = re.compile(r'^(\w+?)(_bucket|_count|_sum)?(?:\{(.*)\})? (\S+)$')
+
+
+def check_exposition(text):
+    """Histogram series in a /metrics body: {(name, labels): count}; raises if any is malformed."""
+    buckets = collections.defaultdict(list)
+    counts = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, suffix, labels, value = SAMPLE.match(line).groups()
+        if suffix == '_bucket':
+            series, le = labels.rsplit(',le=', 1)
+            buckets[name, series].append((le.strip('"'), float(value)))
+        elif suffix == '_count':
+            counts[name, labels] = float(value)
+    for key, series in buckets.items():
+        values = [value for _, value in series]
+        if values != sorted(values) or series[-1][0] != '+Inf' or values[-1] != counts[key]:
+            raise AssertionError(f'malformed histogram {key}')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=20, help='counties switched to per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    client = app.app.server.test_client()
+    bodies = []
+    for county in dataset.counties[:args.counties]:
+        body = copy.deepcopy(CALLBACK_BODY)
+        body['inputs'][0]['value'] = county
+        bodies.append(body)
+        client.post('/_dash-update-component', json=body)
+
+    samples = {False: [], True: []}
+    for _ in range(args.rounds):
+        for enabled in [False, True]:
+            metrics.ENABLED = enabled
+            for body in bodies:
+                start = time.perf_counter()
+                client.post('/_dash-update-component', json=body)
+                samples[enabled].append(time.perf_counter() - start)
+    off, on = (statistics.median(samples[enabled]) * 1e6 for enabled in [False, True])
+
+    n = 100000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.stage_seconds.time('benchmark'):
+            pass
+    block = (time.perf_counter() - start) / n * 1e6
+
+    counts = check_exposition(client.get('/metrics').get_data(as_text=True))
+    print(f'callback request: {off:.0f} us recording off, {on:.0f} us on ({on - off:+.0f} us); '
+          f'one timed block {block:.2f} us')
+    print(f'/metrics: {len(counts)} histogram series, all well formed')
+
+
+if __name__ == '__main__':
+    main()
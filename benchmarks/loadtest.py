@@ -0,0 +1,284 @@
+"""Load test: county switches POSTed to a locally served app, per worker/thread configuration.
+
+For each --configs entry (WORKERSxTHREADS) it starts gunicorn with
+gunicorn.conf.py, waits until /readyz reports the figure cache warm and sends
+--warmup seconds of unmeasured traffic. Then it drives the county-dropdown
+chart callback through _dash-update-component the way a browser does: a JSON
+body with the previous county's rendered state, and Accept-Encoding: gzip, br.
+Counties are drawn from a Zipf distribution over their rank by enrollment
+(--zipf, 0 for uniform), so the big counties get most of the traffic. The
+counties, their order by latest reported enrollment (from the statewide
+ranking tables) and the data version are read from the server under test,
+so nothing is loaded locally. There are two modes, each run for --duration
+seconds:
+
+- closed loop (--concurrency N): N clients each send a request as soon as
+  the previous one is answered; measures the throughput a configuration can
+  sustain
+- open loop (--rate R): requests arrive as a Poisson process at R per second
+  whatever the server does, and latency runs from each request's scheduled
+  arrival, so queueing under overload shows up instead of being hidden
+
+It reports throughput, p50/p99 latency and error rate per configuration. Use
+--url to test a server that is already running instead. The load generator is
+one Python process; check its CPU isn't the bottleneck at high rates.
+
+Usage (from the repository root):
+    python -m benchmarks.loadtest [--configs 1x4,2x4,4x4] [--concurrency 16] [--rate 200]
+                                  [--duration 10] [--warmup 2] [--zipf 1.0] [--url http://host:port]
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import copy
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from benchmarks.memory import CALLBACK_BODY
+
+HEADERS = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip, br'}
+
+# Ranked to order the counties by size
+ENROLLMENT_METRIC = 'Public School Final Enrollment'
+
+
+def popularity(counties, exponent):
+    """Zipf weights for counties listed most popular first."""
+    return [1 / (rank + 1) ** exponent for rank in range(len(counties))]
+
+
+class Client:
+    """One keep-alive connection per thread to the server under test."""
+
+    def __init__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+        self.local = threading.local()
+
+    def post(self, path, body, method='POST', headers=HEADERS):
+        """Send a request; (status, body). Reconnects once if the kept-alive connection was closed."""
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            if connection is None:
+                connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+
+def json_response(client, path, body=None):
+    """The decoded JSON of a GET (or a POST of ``body``), failing on any status but 200."""
+    # Without Accept-Encoding, so the response comes uncompressed
+    status, content = client.post(path, None if body is None else json.dumps(body).encode(),
+                                  'GET' if body is None else 'POST', {'Content-Type': 'application/json'})
+    if status != 200:
+        raise RuntimeError(f'{path} answered {status}')
+    return json.loads(content)
+
+
+def find_component(node, component_id):
+    """The props of the component with this id in a Dash layout tree, or None."""
+    if isinstance(node, dict):
+        if node.get('props', {}).get('id') == component_id:
+            return node['props']
+        return find_component(node.get('props', {}).get('children'), component_id)
+    if isinstance(node, list):
+        for child in node:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def callback(client, outputs, inputs, state=()):
+    """Call a multi-output callback as dash-renderer does; the response's values by output id."""
+    body = {
+        'output': '..' + '...'.join(f'{id_}.{prop}' for id_, prop in outputs) + '..',
+        'outputs': [{'id': id_, 'property': prop} for id_, prop in outputs],
+        'inputs': [{'id': id_, 'property': prop, 'value': value} for id_, prop, value in inputs],
+        'state': [{'id': id_, 'property': prop, 'value': value} for id_, prop, value in state],
+        'changedPropIds': [f'{inputs[0][0]}.{inputs[0][1]}'],
+    }
+    return json_response(client, '/_dash-update-component', body)['response']
+
+
+def server_counties(client):
+    """(counties by latest reported enrollment, largest first, data version) as the server has them."""
+    layout = json_response(client, '/_dash-layout')
+    counties = [option['value'] for option in find_component(layout, 'county-dropdown')['options']]
+    version = json_response(client, '/cache-stats')['version']
+    years = callback(client, [('ranking-year', 'options'), ('ranking-year', 'value')],
+                     [('ranking-metric', 'value', ENROLLMENT_METRIC)],
+                     [('ranking-year', 'value', None)])['ranking-year']['options']
+    # Each county's latest enrollment, from the ranking tables of the latest years until all have one
+    enrollment = {}
+    for year in years:
+        if len(enrollment) == len(counties):
+            break
+        rows = callback(client, [('ranking-table', 'data'), ('ranking-table', 'style_data_conditional')],
+                        [('tabs', 'value', 'rankings'), ('ranking-metric', 'value', ENROLLMENT_METRIC),
+                         ('ranking-year', 'value', year), ('county-dropdown', 'value', None)])['ranking-table']['data']
+        for row in rows:
+            enrollment.setdefault(row['county'], row['value'])
+    return sorted(counties, key=lambda county: -enrollment.get(county, 0)), version
+
+
+def switch_body(county, previous, version):
+    """A county switch from ``previous``, as dash-renderer sends it once the pupils tab is drawn."""
+    body = copy.deepcopy(CALLBACK_BODY)
+    body['inputs'][0]['value'] = county
+    body['state'][0]['value'] = {'county': previous, 'version': version}
+    return json.dumps(body).encode()
+
+
+class Traffic:
+    """Random county switches, weighted by popularity."""
+
+    def __init__(self, counties, weights, version, seed=0):
+        self.counties = counties
+        self.weights = weights
+        self.version = version
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def next_body(self):
+        with self.lock:
+            previous, county = self.random.choices(self.counties, self.weights, k=2)
+        return switch_body(county, previous, self.version)
+
+
+def timed_request(client, body, since=None):
+    """(seconds since ``since`` or now, ok)."""
+    start = since if since is not None else time.perf_counter()
+    try:
+        status, _ = client.post('/_dash-update-component', body)
+        ok = status == 200
+    except (http.client.HTTPException, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def closed_loop(client, traffic, concurrency, duration):
+    deadline = time.perf_counter() + duration
+
+    def user():
+        samples = []
+        while time.perf_counter() < deadline:
+            samples.append(timed_request(client, traffic.next_body()))
+        return samples
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        return [sample for samples in pool.map(lambda _: user(), range(concurrency)) for sample in samples]
+
+
+def open_loop(client, traffic, rate, duration, max_in_flight):
+    arrivals = random.Random(1)
+    futures = []
+    with concurrent.futures.ThreadPoolExecutor(max_in_flight) as pool:
+        start = time.perf_counter()
+        scheduled = start
+        while scheduled < start + duration:
+            scheduled += arrivals.expovariate(rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(timed_request, client, traffic.next_body(), scheduled))
+        return [future.result() for future in futures]
+
+
+def summary(samples, duration):
+    latencies = sorted(seconds for seconds, ok in samples if ok)
+    errors = sum(not ok for _, ok in samples)
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else [0] * 99
+    return {
+        'requests': len(samples),
+        'throughput': len(latencies) / duration,
+        'p50_ms': quantiles[49] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'error_rate': errors / len(samples) if samples else 0.0,
+    }
+
+
+def wait_ready(url, deadline=180):
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            urllib.request.urlopen(url + '/readyz', timeout=5).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'{url} did not become ready')
+
+
+@contextlib.contextmanager
+def served(workers, threads, port):
+    """A gunicorn server with this configuration, once its figure cache is warm."""
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server',
+               '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null']
+    env = dict(os.environ, DASHBOARD_WORKERS=str(workers), DASHBOARD_THREADS=str(threads))
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}'
+        wait_ready(url)
+        yield url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--configs', default='1x4,2x4,4x4', help='comma-separated WORKERSxTHREADS to start')
+    parser.add_argument('--url', help='test this running server instead of starting gunicorn')
+    parser.add_argument('--concurrency', type=int, default=16, help='closed-loop clients (0 to skip)')
+    parser.add_argument('--rate', type=float, default=200, help='open-loop arrivals per second (0 to skip)')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='open-loop requests outstanding at most')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per mode and configuration')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured traffic before measuring')
+    parser.add_argument('--zipf', type=float, default=1.0, help='popularity skew by enrollment rank')
+    parser.add_argument('--port', type=int, default=8098)
+    args = parser.parse_args()
+
+    if args.url:
+        configs = [(args.url, contextlib.nullcontext(args.url.rstrip('/')))]
+    else:
+        configs = []
+        for config in args.configs.split(','):
+            workers, threads = (int(n) for n in config.split('x'))
+            configs.append((config, served(workers, threads, args.port)))
+    modes = [(f'closed {args.concurrency}', lambda client: closed_loop(client, traffic, args.concurrency,
+                                                                       args.duration))] if args.concurrency else []
+    if args.rate:
+        modes.append((f'open {args.rate:g}/s', lambda client: open_loop(client, traffic, args.rate, args.duration,
+                                                                        args.max_in_flight)))
+
+    print(f'{"config":<10} {"mode":<14} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for name, server in configs:
+        with server as url:
+            counties, version = server_counties(Client(url))
+            traffic = Traffic(counties, popularity(counties, args.zipf), version)
+            # /readyz answers from one worker; traffic reaches (and warms) them all
+            closed_loop(Client(url), traffic, max(args.concurrency, 1), args.warmup)
+            for mode, run in modes:
+                result = summary(run(Client(url)), args.duration)
+                print(f'{name:<10} {mode:<14} {result["requests"]:9d} {result["throughput"]:8.1f} '
+                      f'{result["p50_ms"]:8.2f} {result["p99_ms"]:8.2f} {result["error_rate"]:7.2%}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
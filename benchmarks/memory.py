@@ -0,0 +1,111 @@
+"""Measure per-worker memory of the gunicorn deployment with and without preloading.
+
+Starts gunicorn twice on a local port, once loading the app in each worker and
+once in the master before forking (the gunicorn.conf.py default), sends a few
+chart requests, then reads every worker's RSS, PSS and private (unshared)
+memory from /proc. Linux only.
+
+Usage (from the repository root):
+    python -m benchmarks.memory [--workers 4] [--port 8099]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+# The pupils tab's first render for a county (no figures in the page yet)
+CALLBACK_BODY = {
+    'output': '..pupils-total-enrollment.figure...pupils-enrollment-by-race.figure'
+              '...pupils-enrollment-public-percentage.figure...pupils-rendered.data..',
+    'outputs': [{'id': graph_id, 'property': 'figure'} for graph_id in
+                ['pupils-total-enrollment', 'pupils-enrollment-by-race', 'pupils-enrollment-public-percentage']]
+               + [{'id': 'pupils-rendered', 'property': 'data'}],
+    'inputs': [{'id': 'county-dropdown', 'property': 'value', 'value': 'Wake County'},
+               {'id': 'tabs', 'property': 'value', 'value': 'pupils'},
+               {'id': 'compare-counties', 'property': 'value', 'value': []}],
+    'state': [{'id': 'pupils-rendered', 'property': 'data'}],
+    'changedPropIds': ['county-dropdown.value'],
+}
+
+
+def smaps(pid):
+    """Memory counters of a process in MiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_until_ready(master, workers, url, deadline=120):
+    """Wait for every worker to boot and answer, and for their memory to settle."""
+    start = time.time()
+    while time.time() - start < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+        except OSError:
+            time.sleep(0.5)
+            continue
+        pids = children(master)
+        if len(pids) == workers:
+            before = [smaps(pid)['rss'] for pid in pids]
+            time.sleep(2)
+            if [smaps(pid)['rss'] for pid in pids] == before:
+                return pids
+        time.sleep(0.5)
+    raise RuntimeError('gunicorn workers did not become ready')
+
+
+def measure(preload, workers, port):
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server',
+               '--workers', str(workers), '--bind', f'127.0.0.1:{port}']
+    env = dict(os.environ, DASHBOARD_PRELOAD='1' if preload else '0')
+    master = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}'
+        pids = wait_until_ready(master.pid, workers, url + '/')
+        # Exercise the chart callbacks so each worker touches the data it serves
+        request = urllib.request.Request(url + '/_dash-update-component', data=json.dumps(CALLBACK_BODY).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        for _ in range(workers * 8):
+            urllib.request.urlopen(request, timeout=10).read()
+        return smaps(master.pid), [smaps(pid) for pid in pids]
+    finally:
+        master.terminate()
+        master.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8099)
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers, MiB per worker (mean)')
+    print(f'{"mode":<12} {"rss":>8} {"pss":>8} {"private":>8} {"total pss":>10}')
+    for preload in [False, True]:
+        master, workers = measure(preload, args.workers, args.port)
+        mean = {key: sum(worker[key] for worker in workers) / len(workers) for key in ['rss', 'pss', 'private']}
+        total_pss = master['pss'] + sum(worker['pss'] for worker in workers)
+        print(f'{"preload" if preload else "per-worker":<12} {mean["rss"]:8.1f} {mean["pss"]:8.1f} '
+              f'{mean["private"]:8.1f} {total_pss:10.1f}')
+
+
+if __name__ == '__main__':
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('benchmarks.memory needs Linux /proc/<pid>/smaps_rollup')
+    main()
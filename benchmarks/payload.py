@@ -0,0 +1,90 @@
+"""Response size of a county switch: whole figures vs Dash Patch updates.
+
+Walks every county in dropdown order, as a visitor switching counties would,
+and for each tab serializes the callback response both ways: the whole figures
+(what the first render of a tab sends) and the patches sent once the tab holds
+the previous county's figures. It checks that applying each patch to the
+previous county's figures gives the new county's figures (the same values,
+though patches may encode them more compactly), then reports the mean
+response size per tab, raw and gzip-compressed.
+
+Usage (from the repository root):
+    python -m benchmarks.payload [--counties N]
+"""
+import argparse
+import copy
+import gzip
+import json
+
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+from charts import typed_array_values
+
+
+def decoded(value):
+    """A figure with typed arrays decoded to plain lists, to compare values regardless of encoding."""
+    if isinstance(value, dict):
+        if set(value) == {'dtype', 'bdata'}:
+            return [None if v != v else float(v) for v in typed_array_values(value)]
+        return {key: decoded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decoded(item) for item in value]
+    return value
+
+
+def apply_patch(figure, patch):
+    """Apply a serialized Patch's Assign and Delete operations to a figure, as dash-renderer does."""
+    figure = copy.deepcopy(figure)
+    for operation in patch['operations']:
+        if operation['operation'] not in ('Assign', 'Delete'):
+            raise AssertionError(f'unexpected patch operation {operation["operation"]}')
+        *path, last = operation['location']
+        target = figure
+        for key in path:
+            target = target[key]
+        if operation['operation'] == 'Delete':
+            del target[last]
+        else:
+            target[last] = operation['params']['value']
+    return figure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=len(dataset.counties), help='number of counties to run')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+
+    sizes = {tab: {'full': 0, 'full_gz': 0, 'patch': 0, 'patch_gz': 0} for tab in app.TAB_GRAPHS}
+    for previous, county in zip(counties, counties[1:]):
+        for tab, graph_ids in app.TAB_GRAPHS.items():
+            full = app.update_tab(county, tab, [], None, tab=tab)
+            patches = app.update_tab(county, tab, [], app.rendered_state(previous), tab=tab)
+            full_json = to_json_plotly(full[:-1])
+            patch_json = to_json_plotly(patches[:-1])
+
+            # The browser holds the previous county's figures; patching them must give the new ones
+            shown = json.loads(to_json_plotly(list(app.tab_figures(previous, tab))))
+            expected = json.loads(full_json)
+            for graph_id, figure, patch, target in zip(graph_ids, shown, json.loads(patch_json), expected):
+                if decoded(apply_patch(figure, patch)) != decoded(target):
+                    raise AssertionError(f'patching {graph_id} from {previous} to {county} differs from the figure')
+
+            for kind, payload in [('full', full_json), ('patch', patch_json)]:
+                sizes[tab][kind] += len(payload)
+                sizes[tab][kind + '_gz'] += len(gzip.compress(payload.encode()))
+
+    n = len(counties) - 1
+    print(f'{n} county switches, patched figures match the full figures')
+    print(f'{"tab":<12} {"full kB":>8} {"patch kB":>9} {"ratio":>6}   {"gzip full":>9} {"gzip patch":>10} {"ratio":>6}')
+    totals = {kind: sum(size[kind] for size in sizes.values()) for kind in ['full', 'full_gz', 'patch', 'patch_gz']}
+    for tab, size in list(sizes.items()) + [('all tabs', totals)]:
+        print(f'{tab:<12} {size["full"] / n / 1024:8.1f} {size["patch"] / n / 1024:9.1f} '
+              f'{size["full"] / size["patch"]:5.1f}x   {size["full_gz"] / n / 1024:9.1f} '
+              f'{size["patch_gz"] / n / 1024:10.1f} {size["full_gz"] / size["patch_gz"]:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Statewide rankings: one vectorized pass over the metric cube vs pandas rank per metric.
+
+Checks every county's rank and percentile, for every cube metric and year,
+against pandas: ranks from a groupby-by-year rank of each metric (highest
+first, ties sharing the better rank), percentiles from the share of other
+reporting counties with a lower value. Then it times building the rankings
+both ways, and the lookups requests make from the precomputed arrays: a
+ranking table and the rank notes of every chart.
+
+Usage (from the repository root):
+    python -m benchmarks.rankings [--repeat 5]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import app
+import dataset
+from rankings import Rankings
+
+
+def long_frame(cube):
+    """The cube as one row per reported (county, year), one column per metric."""
+    county_ids, year_ids = np.nonzero(np.isfinite(cube.values).any(axis=2))
+    frame = pd.DataFrame(cube.values[county_ids, year_ids], columns=cube.metrics)
+    frame['year'] = cube.years[year_ids]
+    frame['county_id'] = county_ids
+    return frame
+
+
+def pandas_rankings(frame, metrics):
+    """Ranks and percentiles per metric, from a groupby rank by year (the baseline)."""
+    ranks, percentiles = {}, {}
+    for metric in metrics:
+        values = frame[metric].where(np.isfinite(frame[metric]))
+        grouped = values.groupby(frame['year'])
+        ranks[metric] = grouped.rank(ascending=False, method='min')
+        lower = grouped.rank(method='min') - 1
+        counts = grouped.transform('count')
+        percentiles[metric] = (100 * lower / (counts - 1)).where(counts > 1)
+    return ranks, percentiles
+
+
+def check(rankings, frame, ranks, percentiles):
+    cube = rankings.cube
+    year_ids = frame['year'].to_numpy() - cube.years[0]
+    county_ids = frame['county_id'].to_numpy()
+    for metric, m in cube.metric_index.items():
+        expected = ranks[metric].fillna(0).to_numpy(dtype='int64')
+        if not np.array_equal(rankings.ranks[year_ids, m, county_ids], expected):
+            raise AssertionError(f'{metric}: ranks differ from pandas')
+        if not np.allclose(rankings.percentiles[year_ids, m, county_ids], percentiles[metric].to_numpy(dtype='float64'),
+                           equal_nan=True):
+            raise AssertionError(f'{metric}: percentiles differ from pandas')
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return min(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    cube = dataset.metric_cube
+    labels = dataset.rankings.labels
+    frame = long_frame(cube)
+
+    vectorized, rankings = timed(lambda: Rankings(cube, labels), args.repeat)
+    baseline, (ranks, percentiles) = timed(lambda: pandas_rankings(frame, cube.metrics), 1)
+    check(rankings, frame, ranks, percentiles)
+    print(f'{len(cube.counties)} counties x {len(cube.years)} years x {len(cube.metrics)} metrics: '
+          f'ranks and percentiles match pandas')
+    print(f'{"build":<36} {"ms":>9}')
+    print(f'{"pandas groupby rank per metric":<36} {baseline * 1000:9.1f}')
+    print(f'{"vectorized over the cube":<36} {vectorized * 1000:9.1f} ({baseline / vectorized:.0f}x faster)')
+
+    year = rankings.years(app.RANKING_METRIC)[0]
+    table, rows = timed(lambda: rankings.table(app.RANKING_METRIC, year), args.repeat * 20)
+    renderer = dataset.chart_renderer
+    notes, _ = timed(lambda: [renderer.rank_annotations(renderer.specs[graph_id], county)
+                              for county in dataset.counties for graph_id in app.ALL_GRAPHS], args.repeat)
+    print(f'{"lookup":<36} {"ms":>9}')
+    print(f'{f"ranking table ({len(rows)} rows)":<36} {table * 1000:9.3f}')
+    print(f'{"rank note, per chart":<36} {notes / len(dataset.counties) / len(app.ALL_GRAPHS) * 1000:9.3f}')
+
+
+if __name__ == '__main__':
+    main()
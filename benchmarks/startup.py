@@ -0,0 +1,92 @@
+"""Compare dataset load time and size: raw Parquet + runtime cleaning vs the typed build and its snapshot.
+
+Usage (from the repository root):
+    python -m benchmarks.startup [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import build_data
+
+
+def load_raw():
+    # The cleaning app.py used to run on every cold start
+    df = pd.read_parquet(build_data.SOURCE_PATH)
+    df = df.replace(',', '', regex=True)
+    numeric_columns = [col for col in df.columns if col != 'area_name']
+    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+def load_typed():
+    return pd.read_parquet(build_data.OUTPUT_PATH)
+
+
+def load_snapshot():
+    return build_data.load_snapshot()
+
+
+def load_projected(columns):
+    return build_data.load_snapshot(columns=columns)
+
+
+def numpy_owned(values):
+    """Whether NumPy allocated the array's memory (rather than viewing a foreign buffer)."""
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    return values.base is None
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(build_data.OUTPUT_PATH):
+        build_data.build().to_parquet(build_data.OUTPUT_PATH, index=False)
+    if build_data.load_snapshot() is None:
+        build_data.write_snapshot()
+
+    # Importing dataset loads and prepares everything, so only its column list is taken, untimed
+    import dataset
+    columns = dataset.DATA_COLUMNS
+
+    raw = timed(load_raw, args.repeat)
+    typed = timed(load_typed, args.repeat)
+    snapshot = timed(load_snapshot, args.repeat)
+    projected = timed(lambda: load_projected(columns), args.repeat)
+    print(f'raw parquet + cleaning: {raw * 1000:8.1f} ms')
+    print(f'typed parquet:          {typed * 1000:8.1f} ms')
+    print(f'mapped arrow snapshot:  {snapshot * 1000:8.1f} ms (includes the fingerprint check)')
+    print(f'chart columns only:     {projected * 1000:8.1f} ms')
+    print(f'saved per cold start:   {(raw - snapshot) * 1000:8.1f} ms ({raw / snapshot:.1f}x)')
+
+    # Resident size of each frame; the raw load keeps text and float64 everywhere
+    sizes = [('raw parquet + cleaning', load_raw()), ('typed, all columns', load_snapshot()),
+             ('typed, chart columns', load_projected(columns))]
+    for name, df in sizes:
+        print(f'{name:<23} {df.shape[1]:4d} columns {build_data.memory_usage(df) / 2 ** 20:7.1f} MiB')
+
+    # The snapshot's numeric columns are views of Arrow's mapped buffers, not NumPy-owned copies
+    df = load_snapshot()
+    floats = [col for col in df.columns if df[col].dtype.kind == 'f']
+    mapped = sum(not numpy_owned(df[col].to_numpy()) for col in floats)
+    print(f'float columns backed by the mapped file: {mapped} of {len(floats)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Regression benchmark suite: load time, callback latency, figure sizes and memory, against a baseline.
+
+Runs offline against the local data files and measures:
+
+- load: seconds to `import app` and load the dataset in a fresh process,
+  median of --repeat, and that process's peak RSS
+- update_charts latency over every county (each the best of --rounds), p50
+  and p95: built from scratch
+  (the renderer on the metric cube, as on a cache miss) and from the figure
+  cache, each including serialization of the response as Dash sends it
+- serialized size of each output figure, averaged over counties
+- peak RSS of this process once every county has been rendered
+
+Results are written as JSON (--output). With --baseline, every metric is
+compared with the saved run and the suite exits non-zero if any is more than
+--threshold (a fraction) worse; all metrics are lower-is-better. Timings are
+specific to a machine, so save the baseline on the machine that compares,
+e.g. on the main branch with --save-baseline, then rerun on a change.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--output benchmarks/results.json] [--baseline benchmarks/baseline.json]
+                               [--save-baseline] [--threshold 0.15] [--repeat 5] [--rounds 5]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from plotly.io.json import to_json_plotly
+
+import app
+import dataset
+
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+
+# Prints the time to import the app and load the dataset, and the peak RSS, from a fresh
+# interpreter. The load is asked for explicitly, so it is timed whatever mode importing app uses
+LOAD_SCRIPT = '''
+import json, resource, time
+start = time.perf_counter()
+import app
+app.data()
+print(json.dumps([time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]))
+'''
+
+
+def rss_mib(maxrss):
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def measure_load(repeat):
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', LOAD_SCRIPT], stdout=subprocess.PIPE, text=True, check=True,
+                                env=dict(os.environ, DASHBOARD_LAZY='0'))
+        samples.append(json.loads(result.stdout.splitlines()[-1]))
+    return {
+        'load_seconds': statistics.median(seconds for seconds, _ in samples),
+        'load_peak_rss_mib': statistics.median(rss_mib(maxrss) for _, maxrss in samples),
+    }
+
+
+def built_charts(county):
+    """Every tab's figures for a county built from scratch, as on a cache miss."""
+    view = app.filter_county(county)
+    return tuple(figure for graph_ids in app.TAB_GRAPHS.values()
+                 for figure in dataset.chart_renderer.figures(graph_ids, view))
+
+
+def measure_callbacks(counties, rounds):
+    results = {}
+    for county in counties:
+        app.update_charts(county)
+    for name, update in [('built', built_charts), ('cached', app.update_charts)]:
+        # Each county's best of several rounds, so the percentiles are across counties rather than noise
+        samples = []
+        for county in counties:
+            best = float('inf')
+            for _ in range(rounds):
+                start = time.perf_counter()
+                to_json_plotly(list(update(county)))
+                best = min(best, time.perf_counter() - start)
+            samples.append(best)
+        results[f'update_charts_{name}_p50_ms'] = percentile(samples, 50) * 1000
+        results[f'update_charts_{name}_p95_ms'] = percentile(samples, 95) * 1000
+    return results
+
+
+def measure_sizes(counties):
+    sizes = {graph_id: 0 for graph_id in app.ALL_GRAPHS}
+    for county in counties:
+        for graph_id, figure in zip(app.ALL_GRAPHS, app.update_charts(county)):
+            sizes[graph_id] += len(to_json_plotly(figure))
+    return {f'figure_kb.{graph_id}': size / len(counties) / 1024 for graph_id, size in sizes.items()}
+
+
+def compare(results, baseline):
+    """(metric, baseline, result, change) for every metric in both; change is a fraction, + is worse."""
+    rows = []
+    for metric, value in results.items():
+        if metric in baseline:
+            old = baseline[metric]
+            rows.append((metric, old, value, (value - old) / old if old else 0.0))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help=f'compare with this saved run (e.g. {BASELINE_PATH})')
+    parser.add_argument('--save-baseline', action='store_true', help=f'also save the results as {BASELINE_PATH}')
+    parser.add_argument('--threshold', type=float, default=0.15, help='fraction worse than the baseline that fails')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes to time the load over')
+    parser.add_argument('--rounds', type=int, default=5, help='timings per county, of which the fastest counts')
+    args = parser.parse_args()
+    counties = dataset.counties
+
+    measured = measure_load(args.repeat)
+    measured.update(measure_callbacks(counties, args.rounds))
+    measured.update(measure_sizes(counties))
+    measured['peak_rss_mib'] = rss_mib(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    results = {
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'counties': len(counties), 'data_version': dataset.figure_cache.version},
+        'metrics': measured,
+    }
+
+    for path in [args.output] + ([BASELINE_PATH] if args.save_baseline else []):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f'Wrote {path}')
+
+    if not args.baseline:
+        for metric, value in measured.items():
+            print(f'{metric:<58} {value:10.3f}')
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['environment'] != results['environment']:
+        print(f'Note: baseline environment differs: {baseline["environment"]}')
+    print(f'{"metric":<58} {"baseline":>10} {"now":>10} {"change":>8}')
+    regressions = []
+    for metric, old, new, change in compare(measured, baseline['metrics']):
+        flag = ''
+        if change > args.threshold:
+            regressions.append(metric)
+            flag = '  REGRESSION'
+        print(f'{metric:<58} {old:10.3f} {new:10.3f} {change:+7.1%}{flag}')
+    if regressions:
+        print(f'FAIL: {len(regressions)} metrics more than {args.threshold:.0%} worse than the baseline')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Bytes sent for a page load and a repeat visit, with and without HTTP compression and validators.
+
+Loads the page through the Flask test client as a browser would: the HTML, its
+scripts and stylesheets, the layout, the callback graph and the first tab's
+chart callback for --counties counties. A first visit sends no validators; a
+repeat visit skips the immutable bundles (they are still in the browser cache)
+and revalidates everything else with the ETags of the first visit. Run with and
+without compression to compare, and reports how many requests were 304s.
+
+Usage (from the repository root):
+    python -m benchmarks.transfer [--counties 10]
+"""
+import argparse
+import copy
+import re
+import time
+
+import app
+import dataset
+import http_cache
+from benchmarks.memory import CALLBACK_BODY
+
+
+def callback_body(county):
+    body = copy.deepcopy(CALLBACK_BODY)
+    body['inputs'][0]['value'] = county
+    return body
+
+
+def visit(client, counties, encoding, validators):
+    """(bytes, requests, 304s, seconds) of one visit; fills ``validators`` with the ETags seen."""
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    repeat = bool(validators)
+    sent = requests = not_modified = 0
+    start = time.perf_counter()
+
+    def fetch(key, method, path, **kwargs):
+        nonlocal sent, requests, not_modified
+        request_headers = dict(headers)
+        if key in validators:
+            request_headers['If-None-Match'] = validators[key]
+        response = client.open(path, method=method, headers=request_headers, **kwargs)
+        requests += 1
+        sent += len(response.data)
+        not_modified += response.status_code == 304
+        if response.headers.get('ETag'):
+            validators[key] = response.headers['ETag']
+        return response
+
+    page = http_cache.decompress(fetch('/', 'GET', '/')).decode()
+    if not repeat:
+        for path in re.findall(r'(?:src|href)="(/[^"]+)"', page):
+            fetch(path, 'GET', path)
+    for path in ['/_dash-layout', '/_dash-dependencies']:
+        fetch(path, 'GET', path)
+    for county in counties:
+        fetch(county, 'POST', '/_dash-update-component', json=callback_body(county))
+    return sent, requests, not_modified, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counties', type=int, default=10, help='counties selected per visit')
+    args = parser.parse_args()
+    counties = dataset.counties[:args.counties]
+
+    print(f'{"compression":<12} {"visit":<7} {"kB sent":>8} {"requests":>9} {"304s":>5} {"ms":>7}')
+    for encoding in [None, 'gzip', 'br']:
+        app.http_caching.compress = encoding is not None
+        client = app.app.server.test_client()
+        validators = {}
+        for name in ['first', 'repeat']:
+            sent, requests, not_modified, seconds = visit(client, counties, encoding, validators)
+            print(f'{encoding or "off":<12} {name:<7} {sent / 1024:8.1f} {requests:9d} {not_modified:5d} '
+                  f'{seconds * 1000:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Build the typed dataset the dashboard loads at startup.
+
+Reads the prepared LINC extract and the raw Statistical Profile CSVs, parses
+every number once, pivots the profile tables into the wide per-county layout
+and writes a pre-typed Parquet file. Dtypes are made as small as they can be
+without changing a value: labels are categoricals, and float columns whose
+values all fit float32 exactly (most counts) are stored as float32.
+
+With --snapshot it also writes an uncompressed Arrow IPC snapshot of that file,
+which the app memory-maps: its numeric columns are NumPy views over the page
+cache, shared by every process on the host. The snapshot records a fingerprint
+of the Parquet file it was made from and is ignored once that file changes.
+
+Usage:
+    python build_data.py [--output Data/nc-education-data-typed.parquet] [--snapshot]
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+DATA_DIR = 'Data'
+PROFILE_DIR = os.path.join(DATA_DIR, 'North Carolina Public Schools Statistical Profile')
+SOURCE_PATH = os.path.join(DATA_DIR, 'nc-education-data.parquet')
+OUTPUT_PATH = os.path.join(DATA_DIR, 'nc-education-data-typed.parquet')
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'nc-education-data-typed.arrow')
+
+# Snapshot schema metadata key holding the fingerprint of its source Parquet file
+FINGERPRINT_KEY = b'dashboard_fingerprint'
+
+# Columns that hold labels rather than numbers
+TEXT_COLUMNS = ['area_name', 'area_type']
+
+# Placeholders the Statistical Profile uses for missing or suppressed counts
+NA_VALUES = ['-', '*']
+
+# Profile tables keyed on (LEA, year); their columns are prefixed with the table name
+PROFILE_TABLES = ['current_expense', 'hs_graduate_intentions', 'pupils_by_race_and_sex', 'pupils_grade_accounting']
+
+# District names that don't reduce to "<County> County" by dropping the school suffix
+LEA_COUNTY_NAMES = {
+    'Alamance-Burlington Schools': 'Alamance County',
+    'Charlotte-Mecklenburg Schools': 'Mecklenburg County',
+    'Durham Public Schools': 'Durham County',
+    'Edenton-Chowan Schools': 'Chowan County',
+    'Edenton/Chowan Schools': 'Chowan County',
+    'Elizabeth City-Pasquotank Public Schools': 'Pasquotank County',
+    'Iredell-Statesville Schools': 'Iredell County',
+    'Nash-Rocky Mount Schools': 'Nash County',
+    'Public Schools of Robeson County': 'Robeson County',
+    'Rowan-Salisbury County Schools': 'Rowan County',
+    'Rowan-Salisbury Schools': 'Rowan County',
+}
+
+# Suffixes districts append to the county name, longest first
+LEA_SUFFIXES = [' Public Schools', ' Public School', ' School System', ' Schools']
+
+
+def lea_county_name(lea_name):
+    """Map a school district name to the county area_name it serves."""
+    if lea_name in LEA_COUNTY_NAMES:
+        return LEA_COUNTY_NAMES[lea_name]
+    for suffix in LEA_SUFFIXES:
+        if lea_name.endswith(suffix):
+            return lea_name[:-len(suffix)]
+    return lea_name
+
+
+def profile_path(name):
+    return os.path.join(PROFILE_DIR, f'{name}.csv')
+
+
+def input_paths(source_path=SOURCE_PATH):
+    """Every file build() reads."""
+    return [source_path] + [profile_path(name) for name in PROFILE_TABLES]
+
+
+def read_profile_csv(name):
+    """Read one Statistical Profile CSV with numbers parsed at read time."""
+    profile = pd.read_csv(profile_path(name), thousands=',', na_values=NA_VALUES, dtype={'LEA': str})
+
+    # Keep county-wide districts only; city, charter and state-run schools are dropped
+    profile = profile[profile['LEA'].str.fullmatch(r'\d+', na=False)].copy()
+    profile['area_name'] = profile['LEA Name'].map(lea_county_name)
+    profile = profile[profile['area_name'].str.endswith(' County')]
+    return profile.rename(columns={'Year': 'year'}).drop(columns=['LEA', 'LEA Name'])
+
+
+def pivot_profile(name, profile, type_column=None):
+    """Pivot a profile table into one row per (area_name, year) with prefixed column names."""
+    keys = ['area_name', 'year']
+    if type_column is None:
+        wide = profile.groupby(keys).first()
+        wide.columns = [f'{name}_{col}' for col in wide.columns]
+    else:
+        wide = profile.pivot_table(index=keys, columns=type_column, aggfunc='first', dropna=False)
+        wide.columns = [f'{name}_{value}_{kind}' for value, kind in wide.columns]
+    return wide.astype('float64')
+
+
+def load_profiles():
+    """Read and pivot all Statistical Profile tables."""
+    frames = []
+    for name in PROFILE_TABLES:
+        profile = read_profile_csv(name)
+        if name == 'current_expense':
+            frames.append(pivot_profile(name, profile, type_column='Type'))
+        elif name == 'pupils_grade_accounting':
+            profile = profile.drop(columns=['Month'])
+            frames.append(pivot_profile(name, profile, type_column='Type'))
+        elif name == 'pupils_by_race_and_sex':
+            # Categories added to the survey later are reported blank for earlier years
+            frames.append(pivot_profile(name, profile.fillna(0)))
+        else:
+            frames.append(pivot_profile(name, profile))
+    return pd.concat(frames, axis=1)
+
+
+def load_source(path=SOURCE_PATH):
+    """Load the prepared LINC extract and parse its numeric columns."""
+    source = pd.read_parquet(path)
+    source = source.drop(columns=[col for col in source.columns if col.startswith(tuple(PROFILE_TABLES))])
+    numeric = {}
+    for col in source.columns:
+        if col in TEXT_COLUMNS:
+            continue
+        values = source[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.str.replace(',', '', regex=False).str.strip()
+        numeric[col] = pd.to_numeric(values, errors='coerce')
+    return pd.concat([source[TEXT_COLUMNS], pd.DataFrame(numeric)], axis=1)
+
+
+def build(source_path=SOURCE_PATH):
+    """Return the typed dashboard frame."""
+    source = load_source(source_path)
+    profiles = load_profiles()
+    df = source.merge(profiles, how='left', left_on=['area_name', 'year'], right_index=True)
+    df['year'] = df['year'].astype('int64')
+    return compact_dtypes(df.reset_index(drop=True))
+
+
+def compact_dtypes(df):
+    """Shrink column dtypes without changing any value.
+
+    Consumers convert to float64 before doing arithmetic, so a float32 column
+    computes exactly what its float64 original did.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in TEXT_COLUMNS:
+            values = values.astype('string').astype('category')
+        elif values.dtype == 'float64':
+            original = values.to_numpy()
+            with np.errstate(over='ignore'):
+                narrow = original.astype('float32')
+            if np.array_equal(narrow.astype('float64'), original, equal_nan=True):
+                values = pd.Series(narrow, index=df.index)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def memory_usage(df):
+    """Bytes held by a frame's columns, including category labels."""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+def fingerprint(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_snapshot(parquet_path=OUTPUT_PATH, snapshot_path=SNAPSHOT_PATH):
+    """Write an uncompressed Arrow IPC copy of the typed Parquet file."""
+    table = pq.read_table(parquet_path)
+    columns = []
+    for column in table.columns:
+        # NaN instead of nulls leaves float columns without a validity bitmap, so
+        # they convert to NumPy without a copy
+        if pa.types.is_floating(column.type) and column.null_count:
+            column = pc.fill_null(column, float('nan'))
+        columns.append(column.combine_chunks())
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = fingerprint(parquet_path).encode()
+    table = pa.table(columns, names=table.column_names).replace_schema_metadata(metadata)
+    with ipc.new_file(snapshot_path, table.schema) as writer:
+        writer.write_table(table)
+
+
+def load_typed(columns=None, parquet_path=OUTPUT_PATH):
+    """Read the typed Parquet file, optionally only the given columns."""
+    if columns is not None:
+        available = set(pq.read_schema(parquet_path).names)
+        columns = [col for col in columns if col in available]
+    return pd.read_parquet(parquet_path, columns=columns)
+
+
+def load_snapshot(snapshot_path=SNAPSHOT_PATH, parquet_path=OUTPUT_PATH, columns=None):
+    """Memory-map the snapshot as a DataFrame, or return None if it is missing or stale.
+
+    With ``columns``, only those columns are converted; the rest are never touched.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+    reader = ipc.open_file(pa.memory_map(snapshot_path))
+    if (reader.schema.metadata or {}).get(FINGERPRINT_KEY) != fingerprint(parquet_path).encode():
+        return None
+    table = reader.read_all()
+    if columns is not None:
+        available = set(table.column_names)
+        table = table.select([col for col in columns if col in available])
+    # One block per column keeps every numeric column a view of the mapped file
+    return table.to_pandas(split_blocks=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_PATH, help='prepared LINC Parquet file')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='typed Parquet file to write')
+    parser.add_argument('--snapshot', nargs='?', const=SNAPSHOT_PATH, default=None,
+                        help=f'also write a memory-mappable Arrow snapshot (default {SNAPSHOT_PATH})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = build(args.source)
+    df.to_parquet(args.output, index=False)
+    print(f'Wrote {args.output}: {df.shape[0]} rows x {df.shape[1]} columns '
+          f'({memory_usage(df) / 2 ** 20:.1f} MiB in memory) in {time.perf_counter() - start:.2f}s')
+    if args.snapshot:
+        write_snapshot(args.output, args.snapshot)
+        print(f'Wrote {args.snapshot}: {os.path.getsize(args.snapshot) / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
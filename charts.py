@@ -0,0 +1,433 @@
+"""Declarative chart specs and the builder that renders them for a county.
+
+Each spec names the metrics a chart plots and how it is laid out; ChartRenderer
+builds the layout, legend, toggle menu and statewide traces of every chart once
+and only fills in the selected county's series per request. Adding a chart is
+an entry in CHART_SPECS.
+
+Spec keys:
+    title, yaxis_title   chart and y-axis titles
+    series               [(metric, trace name)] plotted for the county
+    percent              also plot each metric's '<metric>_pct' share, with an
+                         Absolute/Percentage toggle
+    x_start              first year shown, or None to fit the data
+    legend               horizontal legend below the chart (default True)
+    statewide            (metric, average trace name) statewide band and average
+
+With statewide rankings (rankings.py), each chart notes where the county ranks
+among NC counties in its latest year: by each metric, or for percent charts by
+each share.
+"""
+import base64
+
+import numpy as np
+import plotly.graph_objs as go
+from plotly.colors import qualitative
+from dash import Patch
+
+import aggregates
+import metrics
+from derived import FUND_SOURCES, EXPENSE_CATEGORIES
+from rankings import ordinal
+
+LEGEND = dict(
+    orientation="h",  # Horizontal layout for legend
+    y=-0.2,  # Place legend below the chart
+    x=0.5,
+    xanchor="center",
+    yanchor="top",
+    title=None,  # Remove "Legend" title
+    traceorder="normal"
+)
+
+# County colors and per-series line styles of comparison charts; colors repeat past 24 counties
+COMPARISON_COLORS = qualitative.Dark24
+SERIES_DASHES = ['solid', 'dash', 'dot', 'dashdot', 'longdash', 'longdashdot']
+
+# Style of the statewide rank note above the plot area
+RANK_ANNOTATION = dict(xref='paper', yref='paper', x=1, y=1, xanchor='right', yanchor='bottom',
+                       align='right', showarrow=False, font=dict(size=11, color='gray'))
+RANKS_PER_LINE = 3
+
+# NumPy dtype -> plotly.js typed array code
+TYPED_ARRAY_CODES = {'int16': 'i2', 'float32': 'f4', 'float64': 'f8'}
+
+EXPENSE_CATEGORY_NAMES = {
+    'EMPLOYEE BENEFITS': 'Employee Benefits',
+    'INSTRUCTIONAL EQUIP.': 'Instructional Equipment',
+    'OTHER OBJECTS': 'Other Objects',
+    'PURCHASED SERVICES': 'Purchased Services',
+    'SALARIES': 'Salaries',
+    'SUPPLIES & MATERIALS': 'Supplies & Materials',
+}
+
+CHART_SPECS = {
+    'pupils-total-enrollment': {
+        'title': "Total Public School Enrollment",
+        'yaxis_title': "Enrollment",
+        'series': [('Public School Final Enrollment', 'Total Enrollment')],
+        'legend': False,
+    },
+    'pupils-enrollment-by-race': {
+        'title': "Public School Enrollment by Race",
+        'yaxis_title': "Enrollment",
+        'series': [('pupils_by_race_BLACK', 'Black'), ('pupils_by_race_WHITE', 'White'),
+                   ('pupils_by_race_HISPANIC', 'Hispanic'), ('pupils_by_race_OTHER', 'Other')],
+        'percent': True,
+        'x_start': 2003,
+    },
+    'pupils-enrollment-public-percentage': {
+        'title': "Public School Enrollment as % of Total Enrollment",
+        'yaxis_title': "Percentage",
+        'series': [('public_enrollment_share', '% Public School Enrollment')],
+        'legend': False,
+    },
+    'finances-funding-percentage': {
+        'title': "Local Public School Funding as % of Total Expenditure",
+        'yaxis_title': "%",
+        'series': [('local_funding_as_perc', 'Funding %')],
+        'x_start': 1978,
+        'statewide': ('local_funding_as_perc', 'Avg Funding % For All Counties'),
+    },
+    'finances-expenditure-per-pupil': {
+        'title': "Public School Local Expenditure Per Pupil",
+        'yaxis_title': "Expenditure (000s)",
+        'series': [('local_expenditure_per_pupil', 'Local')],
+        'x_start': 1978,
+        'statewide': ('local_expenditure_per_pupil', 'Avg Local For All Counties'),
+    },
+    'finances-source-breakdown': {
+        'title': "Public School Expenditure Per Pupil by Source",
+        'yaxis_title': "Expenditure (000s)",
+        'series': [(f'expenditure_per_pupil_{source}', source) for source in FUND_SOURCES],
+        'percent': True,
+        'x_start': 1978,
+    },
+    'expenses-total': {
+        'title': "Current Expenses by Category",
+        'yaxis_title': "Total",
+        'series': [(f'current_expense_SourceTotal_{category}', EXPENSE_CATEGORY_NAMES[category])
+                   for category in EXPENSE_CATEGORIES],
+        'percent': True,
+        'x_start': 2003,
+    },
+}
+for _graph_id, _category in [('expenses-salaries-by-source', 'SALARIES'),
+                             ('expenses-employee-benefit-by-source', 'EMPLOYEE BENEFITS'),
+                             ('expenses-supplies-by-source', 'SUPPLIES & MATERIALS'),
+                             ('expenses-services-by-source', 'PURCHASED SERVICES'),
+                             ('expenses-instructional-equipment-by-source', 'INSTRUCTIONAL EQUIP.')]:
+    CHART_SPECS[_graph_id] = {
+        'title': f"{EXPENSE_CATEGORY_NAMES[_category]} Funding by Source",
+        'yaxis_title': "Total",
+        'series': [(f'current_expense_Source{source}_{_category}', f'{source} - {EXPENSE_CATEGORY_NAMES[_category]}')
+                   for source in FUND_SOURCES],
+        'percent': True,
+        'x_start': 2003,
+    }
+CHART_SPECS.update({
+    'personnel-total': {
+        'title': "Personnel Summary by Category",
+        'yaxis_title': "Total",
+        'series': [(f'personnel_{category}', category) for category in ['Administrators', 'Teachers', 'Professionals']],
+        'x_start': 2003,
+    },
+    'personnel-teacher-by-source': {
+        'title': "Teachers Personnel Funding by Source",
+        'yaxis_title': "Total",
+        'series': [(f'personnel_Teachers_{source}', f'{source} - Teachers') for source in FUND_SOURCES],
+        'percent': True,
+        'x_start': 2003,
+    },
+    'personnel-admin-by-source': {
+        'title': "Administrator Personnel Funding by Source",
+        'yaxis_title': "Total",
+        'series': [(f'personnel_Administrators_{source}', f'{source} - Admins') for source in FUND_SOURCES],
+        'percent': True,
+        'x_start': 2003,
+    },
+    'graduate-intentions': {
+        'title': "High School Graduates by Post-Graduate Intentions",
+        'yaxis_title': "Total",
+        'series': [('graduates_PublicSeniorInstitutions', 'Public Senior Institution'),
+                   ('graduates_PrivateSeniorInstitutions', 'Private Senior Institution'),
+                   ('graduates_CommunityTechnicalCollege', 'Community Technical College'),
+                   ('graduates_PrivateJuniorInstitutions', 'Private Junior Institution'),
+                   ('graduates_TradeBusinessNursing', 'Trade Business Nursing'),
+                   ('graduates_Other', 'Other')],
+        'percent': True,
+        'x_start': 2003,
+    },
+})
+
+
+def toggle_menu(n_series):
+    """Absolute/Percentage buttons for a chart with ``n_series`` traces of each kind."""
+    return dict(
+        type="buttons",
+        direction="left",
+        buttons=[
+            dict(label="Show Absolute",
+                 method="update",
+                 args=[{"visible": [True] * n_series + [False] * n_series},
+                       {"yaxis": {"title": "Total"}}]),
+            dict(label="Show Percentage",
+                 method="update",
+                 args=[{"visible": [False] * n_series + [True] * n_series},
+                       {"yaxis": {"title": "Percentage"}}])
+        ],
+        showactive=True,
+        x=0.5,
+        xanchor="center",
+        y=1.2,
+        yanchor="top"
+    )
+
+
+def chart_layout(spec):
+    """The county-independent part of a chart's layout."""
+    layout = dict(title=spec['title'], xaxis=dict(title="Year"), yaxis_title=spec['yaxis_title'], autosize=True)
+    if spec.get('legend', True):
+        layout['legend'] = LEGEND
+    if spec.get('percent'):
+        layout['updatemenus'] = [toggle_menu(len(spec['series']))]
+    return layout
+
+
+def statewide_traces(table, metric, avg_name):
+    """The statewide 10th-90th percentile band and dashed average line for a metric."""
+    band_years, p90 = aggregates.statewide_series(table, metric, 'p90')
+    _, p10 = aggregates.statewide_series(table, metric, 'p10')
+    avg_years, avg = aggregates.statewide_series(table, metric)
+    return [
+        go.Scatter(x=band_years, y=p90, mode='lines', line=dict(width=0),
+                   showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=band_years, y=p10, mode='lines', line=dict(width=0),
+                   fill='tonexty', fillcolor='rgba(128, 128, 128, 0.2)',
+                   name='10th-90th Percentile For All Counties', hoverinfo='skip'),
+        go.Scatter(x=avg_years, y=avg, mode='lines', name=avg_name,
+                   line=dict(color='gray', dash='dot')),
+    ]
+
+
+def series_metrics(spec):
+    """Metrics of a chart's county traces, in trace order."""
+    metrics = [metric for metric, _ in spec['series']]
+    if spec.get('percent'):
+        metrics += [f'{metric}_pct' for metric in metrics]
+    return metrics
+
+
+def series_names(spec):
+    """Names of a chart's county traces, in trace order."""
+    if spec.get('percent'):
+        return [f'{name} (Absolute)' for _, name in spec['series']] + [f'{name} (%)' for _, name in spec['series']]
+    return [name for _, name in spec['series']]
+
+
+def rank_metrics(spec):
+    """The metrics a chart's rank note ranks: each series' share for percent charts, else each series."""
+    return series_metrics(spec)[-len(spec['series']):]
+
+
+def metric_labels(specs):
+    """'Chart title: trace name' of every metric the charts plot, in chart order."""
+    labels = {}
+    for spec in specs.values():
+        for metric, name in zip(series_metrics(spec), series_names(spec)):
+            labels.setdefault(metric, f"{spec['title']}: {name}")
+    return labels
+
+
+def series_traces(spec, view=None):
+    """A chart's county traces; without a view they carry no x/y data."""
+    if spec.get('percent'):
+        visible = [True] * len(spec['series']) + [False] * len(spec['series'])
+    else:
+        visible = [None] * len(spec['series'])
+    traces = []
+    for metric, name, shown in zip(series_metrics(spec), series_names(spec), visible):
+        data = dict(x=view['year'], y=view[metric]) if view is not None else {}
+        traces.append(go.Scatter(mode='lines+markers', name=name, visible=shown, **data))
+    return traces
+
+
+def typed_array(values, dtype):
+    """Plotly.js typed array spec of a packed little-endian array, as go.Figure emits it."""
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return {'dtype': TYPED_ARRAY_CODES[values.dtype.name], 'bdata': base64.b64encode(values).decode('ascii')}
+
+
+def typed_array_rows(values, dtype):
+    """typed_array of every row of a 2-D array, converting the whole array once."""
+    values = np.ascontiguousarray(values, dtype=dtype)
+    code = TYPED_ARRAY_CODES[values.dtype.name]
+    return [{'dtype': code, 'bdata': base64.b64encode(row).decode('ascii')} for row in values]
+
+
+def typed_array_values(spec):
+    """Decode a typed array spec back to a NumPy array."""
+    return np.frombuffer(base64.b64decode(spec['bdata']), dtype=spec['dtype'])
+
+
+def compact_typed_array(spec):
+    """The same values as float32 when that is lossless (counts mostly are), halving the bytes."""
+    if spec['dtype'] != 'f8':
+        return spec
+    values = typed_array_values(spec)
+    narrow = values.astype('float32')
+    if not np.array_equal(narrow, values, equal_nan=True):
+        return spec
+    return typed_array(narrow, 'float32')
+
+
+class ChartRenderer:
+    """Renders chart specs for one county at a time as plain figure dicts.
+
+    Each chart's layout, toggle menu, trace styles and statewide traces are
+    built and validated by plotly once, as a template; a request only copies
+    the template and fills in the county's x/y arrays, skipping graph_objects
+    validation entirely. graph_object builds the same chart through
+    plotly.graph_objs and is kept as the reference the fast path is checked
+    against (python -m benchmarks.figures). Returned figures share the
+    template's layout and static traces, so treat them as read-only.
+    """
+
+    def __init__(self, specs, statewide, rankings=None):
+        self.specs = specs
+        self.rankings = rankings
+        self.layouts = {graph_id: chart_layout(spec) for graph_id, spec in specs.items()}
+        self.static_traces = {
+            graph_id: statewide_traces(statewide, *spec['statewide']) if 'statewide' in spec else []
+            for graph_id, spec in specs.items()
+        }
+        self.templates = {}
+        for graph_id, spec in specs.items():
+            template = go.Figure(data=series_traces(spec) + self.static_traces[graph_id])
+            template.update_layout(self.layouts[graph_id])
+            self.templates[graph_id] = template.to_dict()
+
+    def x_range(self, spec, years):
+        return [spec['x_start'], int(years.max()) + 1]
+
+    def rank_annotations(self, spec, county):
+        """A chart's layout annotations for a county: its statewide rank note, if it is ranked."""
+        if self.rankings is None:
+            return []
+        metrics = rank_metrics(spec)
+        year = self.rankings.latest_year(county, metrics[0])
+        if year is None:
+            return []
+        positions = [self.rankings.position(county, metric, year) for metric in metrics]
+        if len(metrics) == 1:
+            if positions[0] is None:
+                return []
+            rank, count, percentile = positions[0]
+            text = f'{ordinal(round(percentile))} percentile of NC counties in {year} (rank {rank} of {count})'
+        else:
+            # By-source traces are named like 'Local - Salaries'; the title already says what is split
+            ranks = [f"{name.split(' - ')[0]} {ordinal(round(position[2]))}"
+                     for (_, name), position in zip(spec['series'], positions) if position is not None]
+            if not ranks:
+                return []
+            lines = [', '.join(ranks[i:i + RANKS_PER_LINE]) for i in range(0, len(ranks), RANKS_PER_LINE)]
+            text = (f"{year} percentile among NC counties{' by share' if spec.get('percent') else ''}: "
+                    + '<br>'.join(lines))
+        return [dict(RANK_ANNOTATION, text=text)]
+
+    def graph_object(self, graph_id, view):
+        """Build one chart for a county's CountyView as a validated go.Figure."""
+        spec = self.specs[graph_id]
+        layout = self.layouts[graph_id]
+        if spec.get('x_start') is not None:
+            layout = dict(layout, xaxis=dict(range=self.x_range(spec, view['year']), title="Year"))
+        annotations = self.rank_annotations(spec, view.county)
+        if annotations:
+            layout = dict(layout, annotations=annotations)
+        fig = go.Figure(data=series_traces(spec, view) + self.static_traces[graph_id])
+        fig.update_layout(layout)
+        return fig
+
+    def figure(self, graph_id, view):
+        """Build one chart for a county's CountyView as a figure dict."""
+        spec = self.specs[graph_id]
+        template = self.templates[graph_id]
+        metrics = series_metrics(spec)
+        x = typed_array(view['year'], 'int16')
+        data = [dict(trace, x=x, y=typed_array(view[metric], 'float64'))
+                for trace, metric in zip(template['data'], metrics)]
+        data += template['data'][len(metrics):]
+        layout = template['layout']
+        if spec.get('x_start') is not None:
+            layout = dict(layout, xaxis=dict(layout['xaxis'], range=self.x_range(spec, view['year'])))
+        annotations = self.rank_annotations(spec, view.county)
+        if annotations:
+            layout = dict(layout, annotations=annotations)
+        return {'data': data, 'layout': layout}
+
+    def figures(self, graph_ids, view):
+        figures = []
+        for graph_id in graph_ids:
+            with metrics.figure_seconds.time(graph_id):
+                figures.append(self.figure(graph_id, view))
+        return tuple(figures)
+
+    def comparison_figure(self, graph_id, counties, group):
+        """One chart overlaying several counties, from a CountyGroupView of them in ``counties`` order.
+
+        Each county gets its own color and legend group; a chart with several
+        series tells them apart by line style.
+        """
+        spec = self.specs[graph_id]
+        template = self.templates[graph_id]
+        metrics = series_metrics(spec)
+        n_series = len(spec['series'])
+        x = typed_array(group['year'], 'int16')
+        data = []
+        # Metric-major, so the Absolute/Percentage menu still shows the first half of the traces
+        for i, (trace, metric) in enumerate(zip(template['data'], metrics)):
+            for j, (county, y) in enumerate(zip(counties, typed_array_rows(group[metric], 'float64'))):
+                color = COMPARISON_COLORS[j % len(COMPARISON_COLORS)]
+                data.append(dict(
+                    trace, x=x, y=y,
+                    name=county if n_series == 1 else f"{county}: {trace['name']}",
+                    legendgroup=county, line=dict(color=color, dash=SERIES_DASHES[i % n_series % len(SERIES_DASHES)]),
+                    marker=dict(color=color),
+                ))
+        data += template['data'][len(metrics):]
+        layout = dict(template['layout'], legend=LEGEND, showlegend=True)
+        if spec.get('percent'):
+            layout['updatemenus'] = [toggle_menu(n_series * len(counties))]
+        if spec.get('x_start') is not None:
+            layout['xaxis'] = dict(layout['xaxis'], range=self.x_range(spec, group['year']))
+        return {'data': data, 'layout': layout}
+
+    def comparison_figures(self, graph_ids, counties, group):
+        return tuple(self.comparison_figure(graph_id, counties, group) for graph_id in graph_ids)
+
+    def patch(self, graph_id, figure, shown=None):
+        """A Patch that turns the rendered figure ``shown`` of this chart into ``figure``.
+
+        Only the county traces' x/y arrays, the x-axis range and the rank note
+        differ between counties, so the patch carries those, and only the ones
+        that differ from ``shown`` (all of them if it is None). Arrays are sent
+        as float32 where that holds the values exactly.
+        """
+        spec = self.specs[graph_id]
+        patch = Patch()
+        for i in range(len(series_metrics(spec))):
+            for axis in ['x', 'y']:
+                values = figure['data'][i][axis]
+                if shown is None or shown['data'][i][axis] != values:
+                    patch['data'][i][axis] = compact_typed_array(values)
+        if spec.get('x_start') is not None:
+            x_range = figure['layout']['xaxis']['range']
+            if shown is None or shown['layout']['xaxis']['range'] != x_range:
+                patch['layout']['xaxis']['range'] = x_range
+        annotations = figure['layout'].get('annotations')
+        if shown is None or shown['layout'].get('annotations') != annotations:
+            if annotations is not None:
+                patch['layout']['annotations'] = annotations
+            elif shown is not None:
+                del patch['layout']['annotations']
+        return patch
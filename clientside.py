@@ -0,0 +1,151 @@
+"""Optional client-side rendering mode.
+
+With DASHBOARD_CLIENTSIDE=1 the server sends each county's chart series once, as
+a packed little-endian Float64Array in a dcc.Store. assets/clientside.js keeps
+every county it has received and builds the figures in the browser from
+templates shipped with the layout, including the percentage views, so switching
+back to a county already seen needs no server round trip.
+"""
+import base64
+import functools
+import json
+import os
+
+from dash import dcc, ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+from plotly.io.json import to_json_plotly
+
+# NumPy and charts are imported where they're used: app.py imports this module
+# for ENABLED even in lazy mode (DASHBOARD_LAZY), which defers loading both
+ENABLED = os.environ.get('DASHBOARD_CLIENTSIDE', '') == '1'
+
+# graph id -> trace indices that don't depend on the county (statewide lines)
+STATIC_TRACES = {
+    'finances-funding-percentage': [1, 2, 3],
+    'finances-expenditure-per-pupil': [1, 2, 3],
+}
+
+# graph id -> how the percentage traces (the second half) are derived from the
+# absolute ones: each part's share of their sum, with 'share_fill_zero'
+# counting missing parts as zero
+PERCENT_RULES = {
+    'pupils-enrollment-by-race': 'share',
+    'finances-source-breakdown': 'share',
+    'expenses-total': 'share_fill_zero',
+    'expenses-salaries-by-source': 'share',
+    'expenses-employee-benefit-by-source': 'share',
+    'expenses-supplies-by-source': 'share',
+    'expenses-services-by-source': 'share',
+    'expenses-instructional-equipment-by-source': 'share',
+    'personnel-teacher-by-source': 'share',
+    'personnel-admin-by-source': 'share',
+    'graduate-intentions': 'share',
+}
+
+
+def trace_roles(graph_id, n_traces):
+    """Classify each trace of a graph as 'series', 'percent' or 'static'."""
+    roles = ['series'] * n_traces
+    if graph_id in PERCENT_RULES:
+        for i in range(n_traces // 2, n_traces):
+            roles[i] = 'percent'
+    for i in STATIC_TRACES.get(graph_id, []):
+        roles[i] = 'static'
+    return roles
+
+
+def encode(values, dtype):
+    """Base64 of a packed little-endian typed array."""
+    import numpy as np
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def chart_templates(graph_ids, figures):
+    """Figure templates, in graph order, with the county-specific x/y arrays removed.
+
+    The Plotly theme every figure repeats is sent once, as 'theme'.
+    """
+    theme = None
+    charts = []
+    for graph_id, figure in zip(graph_ids, figures):
+        plain = json.loads(to_json_plotly(figure))
+        theme = plain['layout'].pop('template', theme)
+        # The rank note names the county the figure was built for
+        plain['layout'].pop('annotations', None)
+        roles = trace_roles(graph_id, len(plain['data']))
+        for trace, role in zip(plain['data'], roles):
+            if role != 'static':
+                trace.pop('x', None)
+                trace.pop('y', None)
+        charts.append({
+            'id': graph_id,
+            'data': plain['data'],
+            'layout': plain['layout'],
+            'roles': roles,
+            'percent': PERCENT_RULES.get(graph_id),
+        })
+    return {'theme': theme, 'charts': charts}
+
+
+def county_payload(graph_ids, figures, county):
+    """Pack the county-specific series of every graph into one Float64Array."""
+    import numpy as np
+    from charts import typed_array_values
+
+    years = None
+    series = []
+    for graph_id, figure in zip(graph_ids, figures):
+        roles = trace_roles(graph_id, len(figure['data']))
+        for trace, role in zip(figure['data'], roles):
+            if role != 'series':
+                continue
+            if years is None:
+                years = typed_array_values(trace['x'])
+            series.append(typed_array_values(trace['y']))
+    return {
+        'county': county,
+        'length': len(years),
+        'years': encode(years, '<i2'),
+        'series': encode(np.concatenate(series), '<f8'),
+    }
+
+
+def register(app, graph_ids, update_charts, default_county):
+    """Add the series stores to the layout and wire the client-side callbacks."""
+    app.layout.children.extend([
+        dcc.Store(id='chart-templates', data=chart_templates(graph_ids, update_charts(default_county))),
+        dcc.Store(id='county-request'),
+        dcc.Store(id='county-payload'),
+        dcc.Store(id='county-series'),
+    ])
+
+    @functools.lru_cache(maxsize=None)
+    def cached_payload(county):
+        return county_payload(graph_ids, update_charts(county), county)
+
+    # Ask the server only for counties the browser hasn't received yet
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='requestCounty'),
+        Output('county-request', 'data'),
+        [Input('county-dropdown', 'value')],
+        [State('county-series', 'data')]
+    )
+
+    @app.callback(Output('county-payload', 'data'), [Input('county-request', 'data')])
+    def send_county_series(county):
+        if not county:
+            raise PreventUpdate
+        return cached_payload(county)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='mergeSeries'),
+        Output('county-series', 'data'),
+        [Input('county-payload', 'data')],
+        [State('county-series', 'data')]
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='buildFigures'),
+        [Output(graph_id, 'figure') for graph_id in graph_ids],
+        [Input('county-dropdown', 'value'), Input('county-series', 'data')],
+        [State('chart-templates', 'data')]
+    )
@@ -0,0 +1,84 @@
+"""Dense county x year x metric array for constant-time series lookup.
+
+Built once at load time. A county's rows are a contiguous block of the array, so
+each chart series is a zero-copy NumPy view instead of a boolean-mask scan of
+the full frame followed by column lookups by name. Several counties are read
+together with one fancy-indexing gather (county_group), which gives each metric
+as a counties x years matrix.
+"""
+import numpy as np
+
+
+class MetricCube:
+    """values[county_id, year - first_year, metric_id], NaN where there is no data."""
+
+    def __init__(self, df, counties, metrics, first_year, last_year):
+        self.counties = list(counties)
+        self.metrics = list(metrics)
+        self.years = np.arange(first_year, last_year + 1, dtype='int64')
+        self.county_index = {county: i for i, county in enumerate(self.counties)}
+        self.metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+
+        rows = df[df['area_name'].isin(self.counties) & (df['year'] >= first_year) & (df['year'] <= last_year)]
+        county_ids = rows['area_name'].map(self.county_index).to_numpy(dtype='int64')
+        year_ids = rows['year'].to_numpy(dtype='int64') - first_year
+        self.values = np.full((len(self.counties), len(self.years), len(self.metrics)), np.nan)
+        self.values[county_ids, year_ids, :] = rows[self.metrics].to_numpy(dtype='float64', na_value=np.nan)
+
+        # Years each county has a row for; a contiguous run becomes a slice so views stay zero-copy
+        self.present = np.zeros((len(self.counties), len(self.years)), dtype=bool)
+        self.present[county_ids, year_ids] = True
+        self.rows = []
+        for county_present in self.present:
+            offsets = np.flatnonzero(county_present)
+            if len(offsets) and offsets[-1] - offsets[0] + 1 == len(offsets):
+                self.rows.append(slice(offsets[0], offsets[-1] + 1))
+            else:
+                self.rows.append(offsets)
+
+    def county(self, county):
+        """View of one county's rows."""
+        return CountyView(self, self.county_index[county])
+
+    def county_group(self, counties):
+        """View of several counties' rows, in the order given."""
+        return CountyGroupView(self, [self.county_index[county] for county in counties])
+
+    def series(self, county, metric):
+        """One metric for one county, over the years that county has rows for."""
+        return self.county(county)[metric]
+
+
+class CountyView:
+    """One county's slice of a MetricCube, indexed by metric name like a DataFrame."""
+
+    def __init__(self, cube, county_id):
+        rows = cube.rows[county_id]
+        self.county = cube.counties[county_id]
+        self.metric_index = cube.metric_index
+        self.values = cube.values[county_id, rows]
+        self.year = cube.years[rows]
+
+    def __getitem__(self, metric):
+        if metric == 'year':
+            return self.year
+        return self.values[:, self.metric_index[metric]]
+
+
+class CountyGroupView:
+    """Several counties' slices of a MetricCube over the years any of them has rows for.
+
+    Indexing by metric name gives a counties x years matrix; years a county has
+    no row for are NaN.
+    """
+
+    def __init__(self, cube, county_ids):
+        years = cube.present[county_ids].any(axis=0)
+        self.metric_index = cube.metric_index
+        self.values = cube.values[np.ix_(county_ids, years)]
+        self.year = cube.years[years]
+
+    def __getitem__(self, metric):
+        if metric == 'year':
+            return self.year
+        return self.values[:, :, self.metric_index[metric]]
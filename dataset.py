@@ -0,0 +1,108 @@
+"""The prepared dataset and everything derived from it, built when first imported.
+
+Loads the typed dataset, computes the derived metrics, statewide statistics and
+the metric cube, and sets up the chart renderer and figure caches. app.py
+imports this module at startup, or with DASHBOARD_LAZY=1 on first use or from a
+background warm-up thread, so an instance can answer requests before pandas and
+NumPy are even imported. Python's import lock makes concurrent first uses wait
+for the one load in progress.
+"""
+import inspect
+import os
+import time
+
+import pandas as pd
+
+import aggregates
+import build_data
+import charts
+import derived
+import prerender
+from cube import MetricCube
+from derived import FUND_SOURCES, EXPENSE_CATEGORIES
+from figure_cache import FigureCache, data_version
+from rankings import Rankings
+
+# Columns the charts read, held in a dense county x year x metric cube
+CHART_COLUMNS = (
+    ['Public School Final Enrollment']
+    + [f'current_expense_Source{source}_{category}'
+       for source in ['Total'] + FUND_SOURCES for category in EXPENSE_CATEGORIES]
+    + list(derived.DERIVED_METRICS)
+)
+FIRST_YEAR, LAST_YEAR = 1970, 2024
+
+# Every metric the charts plot, in chart order, each with statewide statistics
+PLOTTED_METRICS = list(dict.fromkeys(
+    metric for spec in charts.CHART_SPECS.values() for metric in charts.series_metrics(spec)
+))
+
+# Dataset columns the charts, derived metrics and statewide statistics read. Unless
+# DASHBOARD_COLUMNS=all, nothing else in the extract is loaded.
+DATA_COLUMNS = [
+    col for col in dict.fromkeys(['area_name', 'year'] + CHART_COLUMNS + derived.input_columns())
+    if col not in derived.DERIVED_METRICS
+]
+load_columns = None if os.environ.get('DASHBOARD_COLUMNS') == 'all' else DATA_COLUMNS
+
+# Load data (pre-typed by build_data.py, so no cleaning is needed here)
+load_start = time.perf_counter()
+if os.path.exists(build_data.OUTPUT_PATH):
+    data_paths = [build_data.OUTPUT_PATH]
+    # A current Arrow snapshot is memory-mapped rather than read, so its pages are shared
+    df = build_data.load_snapshot(columns=load_columns)
+    if df is None:
+        df = build_data.load_typed(load_columns)
+else:
+    data_paths = build_data.input_paths()
+    df = build_data.build()
+    if load_columns is not None:
+        df = df[[col for col in load_columns if col in df.columns]]
+dataset_bytes = build_data.memory_usage(df)
+
+# Ratios, shares and totals the charts plot, computed once for every county and year.
+# Before copy-on-write (pandas < 3) concat copies every column, including mapped ones, unless told not to
+CONCAT_OPTIONS = {} if int(pd.__version__.split('.')[0]) >= 3 else {'copy': False}
+df = pd.concat([df, derived.compute_derived(df)], axis=1, **CONCAT_OPTIONS)
+
+# Data preparation
+counties = sorted([county for county in df['area_name'].unique() if 'Schools' not in county and 'County' in county])
+years = sorted(df['year'].dropna().unique())
+
+# Counties by their latest reported enrollment, largest first: a proxy for how often
+# each is viewed, used as the figure warm-up order
+_latest = (df[df['area_name'].isin(counties)].sort_values('year')
+           .groupby('area_name', observed=True)['Public School Final Enrollment'].last().fillna(0))
+counties_by_enrollment = sorted(counties, key=lambda county: -_latest.get(county, 0))
+
+# Statewide per-year statistics; independent of the selected county, so computed once
+statewide = aggregates.statewide_by_year(df[df['area_name'].isin(counties)], PLOTTED_METRICS)
+
+metric_cube = MetricCube(df, counties, CHART_COLUMNS, FIRST_YEAR, LAST_YEAR)
+
+# Every county's statewide rank and percentile for every cube metric and year
+rankings = Rankings(metric_cube, charts.metric_labels(charts.CHART_SPECS))
+
+# Resident data size, for sizing instance memory limits
+derived_bytes = build_data.memory_usage(df) - dataset_bytes
+print(f'Dataset: {len(df)} rows x {len(df.columns) - len(derived.DERIVED_METRICS)} columns '
+      f'{dataset_bytes / 2 ** 20:.1f} MiB, derived metrics {derived_bytes / 2 ** 20:.1f} MiB, '
+      f'metric cube {metric_cube.values.nbytes / 2 ** 20:.1f} MiB', flush=True)
+
+# Chart layouts and statewide traces, built once from the specs in charts.py
+chart_renderer = charts.ChartRenderer(charts.CHART_SPECS, statewide, rankings)
+
+# Source files of the code that turns the data into figures. They are hashed into the
+# data version along with the data files, so editing a chart spec, title or derived
+# metric retires cached figures and prerendered bundles as a data refresh does.
+RENDERER_SOURCES = [inspect.getsourcefile(code) for code in (aggregates, charts, derived, MetricCube, Rankings)]
+
+# Callback outputs, keyed by (county, tab) and the content of the data files and renderer
+figure_cache = FigureCache(data_version(data_paths + RENDERER_SOURCES))
+
+# Figure bundles written by prerender.py, served at /figures/ while they match the data version
+prerendered = prerender.PrerenderedFigures(figure_cache.version)
+COUNTY_BY_BUNDLE = {name: county for county, name in prerender.bundle_names(counties).items()}
+
+# Seconds spent loading and preparing everything above, reported on /metrics
+load_seconds = time.perf_counter() - load_start
@@ -0,0 +1,189 @@
+"""Registry of derived metrics, computed for every county and year at load time.
+
+Each entry names a metric, the function that computes it and the columns (or
+earlier derived metrics) it reads. compute_derived evaluates the registry in
+one vectorized pass over the whole frame, so the chart callbacks only read
+precomputed arrays and the same values are available for cross-county work.
+"""
+import functools
+import operator
+
+import numpy as np
+import pandas as pd
+
+FUND_SOURCES = ['Local', 'State', 'Federal']
+EXPENSE_CATEGORIES = ['EMPLOYEE BENEFITS', 'INSTRUCTIONAL EQUIP.', 'OTHER OBJECTS',
+                      'PURCHASED SERVICES', 'SALARIES', 'SUPPLIES & MATERIALS']
+# Categories charted as a Local/State/Federal split
+SOURCE_SPLIT_CATEGORIES = ['SALARIES', 'EMPLOYEE BENEFITS', 'SUPPLIES & MATERIALS',
+                           'PURCHASED SERVICES', 'INSTRUCTIONAL EQUIP.']
+
+# Race groups charted, and the survey columns each one adds up
+RACE_GROUPS = {
+    'BLACK': ['BLACK'],
+    'WHITE': ['WHITE'],
+    'HISPANIC': ['HISPANIC'],
+    'OTHER': ['INDIAN', 'ASIAN', 'TWO OR MORE RACES', 'PACIFICISLAND'],
+}
+
+PERSONNEL_CATEGORIES = {
+    'Administrators': ['_Administrators_ Official Adm., Mgrs.', '_Administrators_ Principals',
+                       '_Administrators_ Ast. Principals, Teaching', '_Administrators_Ast. Principals, Nonteaching'],
+    'Teachers': ['_Teachers_ Elementary Teachers', '_Teachers_ Secondary Teachers', '_Teachers_ Other Teachers'],
+    'Professionals': ['_Professionals_ Guidance', '_Professionals_ Psychological',
+                      '_Professionals_Librarian, Audiovisual', '_Professionals_Consultant, Supervisor'],
+}
+# Categories charted as a Local/State/Federal split, with the column order the sums use
+PERSONNEL_SPLIT_CATEGORIES = {
+    'Teachers': ['_Teachers_ Elementary Teachers', '_Teachers_ Other Teachers', '_Teachers_ Secondary Teachers'],
+    'Administrators': PERSONNEL_CATEGORIES['Administrators'],
+}
+
+GRADUATE_INTENTIONS = ['PublicSeniorInstitutions', 'PrivateSeniorInstitutions', 'CommunityTechnicalCollege',
+                       'PrivateJuniorInstitutions', 'TradeBusinessNursing', 'Other']
+
+# name -> (function, input column names), evaluated in insertion order
+DERIVED_METRICS = {}
+
+
+def define(name, func, *inputs):
+    """Register a derived metric computed as ``func(*inputs)``."""
+    DERIVED_METRICS[name] = (func, inputs)
+
+
+def fillna(values, fill=0):
+    """Replace NaN (but not infinity) with ``fill``."""
+    return np.where(np.isnan(values), fill, values)
+
+
+def zero_to_nan(values):
+    """Replace zeros with NaN so they don't plot or divide."""
+    return np.where(values == 0, np.nan, values)
+
+
+def add(*values):
+    """Left-to-right sum; missing values propagate."""
+    return functools.reduce(operator.add, values)
+
+
+def add_filled(*values):
+    """Sum counting missing values as zero."""
+    return add(*[fillna(value) for value in values])
+
+
+def divide(numerator, denominator):
+    return numerator / denominator
+
+
+def percent(part, total):
+    return (part / total) * 100
+
+
+def percent_filled(part, total):
+    return (fillna(part) / total) * 100
+
+
+def safe_total(*values):
+    """Total of the parts, NaN where it is missing or zero so shares stay undefined."""
+    return zero_to_nan(fillna(add(*values)))
+
+
+def nonzero_sum(*values):
+    """Sum counting missing values as zero, NaN where the sum is zero."""
+    return zero_to_nan(np.nansum(np.column_stack(values), axis=1))
+
+
+def personnel_sum(year, *values):
+    """Sum personnel counts, hiding the all-zero totals reported before 2005."""
+    total = np.nansum(np.column_stack(values), axis=1)
+    return np.where((year < 2005) & (total == 0), np.nan, total)
+
+
+def graduates_reported(year, values):
+    """Graduate counts with missing values counted as zero in reported years (2005-2023)."""
+    return np.where((year > 2004) & (year < 2024), fillna(values), values)
+
+
+# Pupils
+define('public_enrollment_share',
+       lambda public, nonpublic: public / (public + nonpublic),
+       'Public School Final Enrollment', 'Nonpublic School Enrollment')
+for _group, _races in RACE_GROUPS.items():
+    define(f'pupils_by_race_{_group}', add,
+           *[f'pupils_by_race_and_sex_{race}{sex}' for race in _races for sex in ['Male', 'Female']])
+define('pupils_by_race_TOTAL', add, *[f'pupils_by_race_{group}' for group in RACE_GROUPS])
+for _group in RACE_GROUPS:
+    define(f'pupils_by_race_{_group}_pct', percent, f'pupils_by_race_{_group}', 'pupils_by_race_TOTAL')
+
+# Finances
+define('local_expenditure_per_pupil', divide,
+       'Public School Expenditures - Local (000s)', 'Public School Final Enrollment')
+define('local_funding_as_perc', lambda local, total: (local * 100) / total,
+       'Public School Expenditures - Local (000s)', 'Total Expenditures (000s)')
+for _source in FUND_SOURCES:
+    define(f'expenditure_per_pupil_{_source}', divide,
+           f'Public School Expenditures - {_source} (000s)', 'Public School Final Enrollment')
+define('expenditure_per_pupil_Total', lambda *values: add(*values[:-1]) / values[-1],
+       *[f'Public School Expenditures - {source} (000s)' for source in FUND_SOURCES],
+       'Public School Final Enrollment')
+for _source in FUND_SOURCES:
+    define(f'expenditure_per_pupil_{_source}_pct', percent,
+           f'expenditure_per_pupil_{_source}', 'expenditure_per_pupil_Total')
+
+# Current expenses
+define('current_expense_SourceTotal_categories', add_filled,
+       *[f'current_expense_SourceTotal_{category}' for category in EXPENSE_CATEGORIES])
+for _category in EXPENSE_CATEGORIES:
+    define(f'current_expense_SourceTotal_{_category}_pct', percent_filled,
+           f'current_expense_SourceTotal_{_category}', 'current_expense_SourceTotal_categories')
+for _category in SOURCE_SPLIT_CATEGORIES:
+    define(f'current_expense_SourceSum_{_category}', safe_total,
+           *[f'current_expense_Source{source}_{_category}' for source in FUND_SOURCES])
+    for _source in FUND_SOURCES:
+        define(f'current_expense_Source{_source}_{_category}_pct', percent,
+               f'current_expense_Source{_source}_{_category}', f'current_expense_SourceSum_{_category}')
+
+# Personnel
+for _category, _suffixes in PERSONNEL_CATEGORIES.items():
+    define(f'personnel_{_category}', nonzero_sum,
+           *[f'personnel_summary_TotalFund{suffix}' for suffix in _suffixes])
+for _category, _suffixes in PERSONNEL_SPLIT_CATEGORIES.items():
+    for _source in FUND_SOURCES:
+        define(f'personnel_{_category}_{_source}', personnel_sum,
+               'year', *[f'personnel_summary_{_source}Fund{suffix}' for suffix in _suffixes])
+    define(f'personnel_{_category}_Total', add, *[f'personnel_{_category}_{source}' for source in FUND_SOURCES])
+    for _source in FUND_SOURCES:
+        define(f'personnel_{_category}_{_source}_pct', percent,
+               f'personnel_{_category}_{_source}', f'personnel_{_category}_Total')
+
+# Graduate intentions
+for _intention in GRADUATE_INTENTIONS:
+    define(f'graduates_{_intention}', graduates_reported, 'year', f'hs_graduate_intentions_{_intention}')
+define('graduates_Total', add, *[f'graduates_{intention}' for intention in GRADUATE_INTENTIONS])
+for _intention in GRADUATE_INTENTIONS:
+    define(f'graduates_{_intention}_pct', percent, f'graduates_{_intention}', 'graduates_Total')
+
+
+def input_columns():
+    """Dataset columns the registry reads."""
+    columns = []
+    for _, inputs in DERIVED_METRICS.values():
+        for name in inputs:
+            if name not in DERIVED_METRICS and name not in columns:
+                columns.append(name)
+    return columns
+
+
+def compute_derived(df):
+    """Evaluate every registered metric over all rows of ``df``."""
+    values = {}
+
+    def column(name):
+        if name in values:
+            return values[name]
+        return df[name].to_numpy(dtype='float64', na_value=np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, (func, inputs) in DERIVED_METRICS.items():
+            values[name] = func(*[column(name) for name in inputs])
+    return pd.DataFrame(values, index=df.index)
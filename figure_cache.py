@@ -0,0 +1,176 @@
+"""Memoized chart callback outputs, shared by every worker process on a host.
+
+There are only ~100 counties x 5 tabs, so every callback output is cacheable.
+Entries are keyed by (county, tab) plus a content hash of the data files and of
+the code that renders them, so a data refresh or a chart change starts a fresh
+cache instead of serving stale figures. A bounded
+in-process LRU can sit in front of a directory of JSON files (e.g. under
+/dev/shm) that all workers on a host read and write, so a figure computed by
+one worker is a disk hit for the others. Since figures are filled in from
+prebuilt templates (charts.py) a miss costs well under a millisecond, less than
+parsing a stored entry, so the shared store is off unless a directory is set.
+
+Misses are single-flight: concurrent lookups of a key that is being computed
+wait for that computation and share its result instead of repeating it. With a
+shared store, processes coordinate the same way through a lock file per key, so
+a burst of identical requests across all workers computes each figure once.
+
+Environment:
+    DASHBOARD_CACHE_DIR   shared store directory (default: in-process LRU only)
+    DASHBOARD_CACHE_SIZE  in-process LRU entries (default 512)
+"""
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; processes then don't coordinate misses
+    fcntl = None
+
+from plotly.io.json import to_json_plotly
+
+# Bump when the cached figure format changes so old entries are ignored
+CACHE_FORMAT = 2
+
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '')
+CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 512))
+
+
+def data_version(paths):
+    """Content hash of the files the figures are computed from: the data and the rendering code."""
+    digest = hashlib.sha256(f'format-{CACHE_FORMAT}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class FigureCache:
+    """LRU of callback outputs in front of a shared on-disk store."""
+
+    def __init__(self, version, directory=CACHE_DIR, maxsize=CACHE_SIZE):
+        self.version = version
+        self.directory = os.path.join(directory, version) if directory else None
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.counts = {'memory_hits': 0, 'disk_hits': 0, 'coalesced': 0, 'misses': 0}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key):
+        name = hashlib.sha1(json.dumps(list(key)).encode()).hexdigest()
+        return os.path.join(self.directory, f'{name}.json')
+
+    def get(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counts['memory_hits'] += 1
+                return self.entries[key]
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = concurrent.futures.Future()
+            else:
+                self.counts['coalesced'] += 1
+        if not leader:
+            # Another thread is computing this key; its result (or error) is ours too
+            return flight.result()
+
+        try:
+            value = self.fetch(key, compute)
+        except BaseException as exc:
+            with self.lock:
+                del self.in_flight[key]
+            flight.set_exception(exc)
+            raise
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            del self.in_flight[key]
+        flight.set_result(value)
+        return value
+
+    def fetch(self, key, compute):
+        """Load ``key`` from the shared store, or compute and store it."""
+        value = self.load(key)
+        if value is None:
+            with self.file_lock(key):
+                # Another process may have stored it while this one waited for the lock
+                value = self.load(key)
+                if value is None:
+                    self.count('misses')
+                    value = compute()
+                    self.store(key, value)
+                    return value
+        self.count('disk_hits')
+        return value
+
+    @contextlib.contextmanager
+    def file_lock(self, key):
+        """Hold an exclusive lock on the key's lock file in the shared store, if there is one."""
+        if not self.directory or fcntl is None:
+            yield
+            return
+        try:
+            f = open(self.path(key) + '.lock', 'a')
+        except OSError:
+            yield
+            return
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, value):
+        if not self.directory:
+            return
+        # Write to a temporary file and rename so readers never see a partial entry
+        path = self.path(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(to_json_plotly(value))
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+
+    def stats(self):
+        """Hit/miss counters of this process, plus the current LRU size."""
+        with self.lock:
+            stats = dict(self.counts, entries=len(self.entries), maxsize=self.maxsize,
+                         version=self.version, directory=self.directory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['coalesced'] + stats['misses']
+        stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else None
+        return stats
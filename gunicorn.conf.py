@@ -0,0 +1,30 @@
+"""Gunicorn settings for serving wsgi:server.
+
+Environment:
+    PORT                port to listen on (default 8080)
+    DASHBOARD_WORKERS   worker processes (default: one per CPU)
+    DASHBOARD_THREADS   threads per worker (default 4)
+    DASHBOARD_PRELOAD   0 to load the app in each worker instead of once in the master
+    DASHBOARD_LAZY      1 to serve before the dataset is loaded; each worker then
+                        loads it in a background thread once it is up
+    DASHBOARD_WARMUP_THREADS  figure warm-up threads per worker (see warmup.py)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('DASHBOARD_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('DASHBOARD_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the app (and the dataset) once in the master before forking the workers
+preload_app = os.environ.get('DASHBOARD_PRELOAD', '1') != '0'
+
+timeout = 60
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    # Each worker precomputes figures into its own cache (loading the dataset first in lazy mode)
+    import app
+    app.start_warmup()
@@ -0,0 +1,168 @@
+"""HTTP compression, validators and cache lifetimes for everything the app serves.
+
+- A chart callback response (_dash-update-component) is a pure function of the
+  callback's outputs, inputs and state and the data version, so it gets a
+  strong ETag computed from those before the callback runs, and a request whose
+  If-None-Match matches is answered 304 without running it. The callback is a
+  read-only query that Dash sends as POST, so it is validated as if it were a
+  GET. Browsers don't revalidate POST requests themselves; caches and clients
+  that key on the request body can.
+- Other GET responses (the page, layout, dependencies and figure bundles) get
+  an ETag of their body and a 304 when it matches.
+- Fingerprinted Dash bundles and versioned assets (?m=<mtime>) are immutable.
+- JSON, JavaScript, CSS and HTML are compressed with brotli or gzip, whichever
+  the client prefers. Compressed immutable files are kept in memory, so each
+  bundle is compressed once per process. ETags name the encoding
+  ('<tag>-br'), since each encoding is a different representation.
+
+Environment:
+    DASHBOARD_COMPRESS  0 to send responses uncompressed (e.g. behind a compressing proxy)
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS = os.environ.get('DASHBOARD_COMPRESS', '1') != '0'
+
+# Content-Encodings in order of preference
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html'}
+
+# Bodies smaller than this aren't worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CALLBACK_PATH = '/_dash-update-component'
+
+
+def callback_etag(version, payload):
+    """Validator of a callback response: its outputs, inputs and state, and the data version."""
+    request = {name: payload.get(name) for name in ['output', 'inputs', 'state']}
+    digest = hashlib.sha256(version.encode())
+    digest.update(json.dumps(request, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def decompress(response):
+    """A response's body with its Content-Encoding removed."""
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'br':
+        return brotli.decompress(response.data)
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    return response.data
+
+
+class HttpCache:
+    """Flask request hooks that add validators, cache lifetimes and compression."""
+
+    def __init__(self, data_version, enabled=COMPRESS):
+        # Callable rather than a value: in lazy mode the data version isn't known at startup
+        self.data_version = data_version
+        self.compress = enabled
+        self.immutable_bodies = {}
+        self.lock = threading.Lock()
+
+    def install(self, server):
+        server.before_request(self.check_callback)
+        server.after_request(self.finish)
+
+    def not_modified(self, tag):
+        """Whether the request's If-None-Match names ``tag``, in any content coding."""
+        conditions = flask.request.if_none_match
+        return any(conditions.contains_weak(candidate)
+                   for candidate in [tag] + [f'{tag}-{encoding}' for encoding in ENCODINGS])
+
+    def encoding(self):
+        """The preferred content coding the client accepts, or None."""
+        accepted = flask.request.accept_encodings
+        for encoding in ENCODINGS:
+            if accepted[encoding]:
+                return encoding
+        return None
+
+    def check_callback(self):
+        request = flask.request
+        if request.method != 'POST' or not request.path.endswith(CALLBACK_PATH):
+            return None
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return None
+        tag = flask.g.callback_etag = callback_etag(self.data_version(), payload)
+        if self.not_modified(tag):
+            return self.not_modified_response(tag)
+        return None
+
+    def not_modified_response(self, tag):
+        response = flask.Response(status=304)
+        encoding = self.encoding() if self.compress else None
+        response.set_etag(f'{tag}-{encoding}' if encoding else tag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def finish(self, response):
+        request = flask.request
+        if response.status_code != 200:
+            return response
+        path = request.path
+        immutable = (('/_dash-component-suites/' in path and response.cache_control.max_age)
+                     or (path.startswith('/assets/') and 'm' in request.args))
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE
+        elif request.method == 'POST' and 'callback_etag' in flask.g:
+            response.set_etag(flask.g.callback_etag)
+            response.headers['Cache-Control'] = 'no-cache'
+        elif request.method in ('GET', 'HEAD') and not response.is_streamed:
+            if 'ETag' not in response.headers:
+                response.add_etag()
+            tag, _ = response.get_etag()
+            if tag and self.not_modified(tag):
+                return self.not_modified_response(tag)
+            response.headers.setdefault('Cache-Control', 'no-cache')
+        return self.compressed(response, immutable)
+
+    def compressed(self, response, immutable):
+        if (not self.compress or response.mimetype not in COMPRESSIBLE_TYPES
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.encoding()
+        if encoding is None:
+            return response
+        # Static files are sent straight from disk; read them to compress them
+        response.direct_passthrough = False
+        key = (flask.request.full_path, encoding)
+        with self.lock:
+            body = self.immutable_bodies.get(key) if immutable else None
+        if body is None:
+            data = response.get_data()
+            if len(data) < MIN_COMPRESS_SIZE:
+                return response
+            body = compress(data, encoding)
+            if immutable:
+                with self.lock:
+                    self.immutable_bodies[key] = body
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        tag, weak = response.get_etag()
+        if tag:
+            response.set_etag(f'{tag}-{encoding}', weak)
+        return response
@@ -0,0 +1,151 @@
+"""Latency and size histograms for the hot paths, exposed in Prometheus text format.
+
+Histograms are recorded in process, with a lock and a bisect per observation,
+and rendered only when /metrics is scraped. Every series is labelled by a
+bounded set of names (callback tab, figure id, URL rule), never a raw path.
+Counters kept elsewhere, such as the figure cache's hit counts and the dataset
+load time, are read at scrape time through install()'s ``collect`` callable.
+Like /cache-stats, each gunicorn worker reports its own numbers.
+
+Environment:
+    DASHBOARD_METRICS  0 to record nothing and not serve /metrics
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+import flask
+
+ENABLED = os.environ.get('DASHBOARD_METRICS', '1') != '0'
+
+# Bucket upper bounds, in seconds and bytes
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Timer:
+    """Context manager that records its duration in a histogram series."""
+
+    __slots__ = ['histogram', 'label', 'start']
+
+    def __init__(self, histogram, label):
+        self.histogram = histogram
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(self.label, time.perf_counter() - self.start)
+
+
+class Histogram:
+    """A Prometheus histogram with one label."""
+
+    def __init__(self, name, description, label, buckets):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        # Label value -> per-bucket counts (the last for values over every bound), and their sum
+        self.counts = {}
+        self.sums = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label, value):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(label)
+            if counts is None:
+                counts = self.counts[label] = [0] * (len(self.buckets) + 1)
+                self.sums[label] = 0
+            counts[index] += 1
+            self.sums[label] += value
+
+    def time(self, label):
+        """``with histogram.time(label):`` records how long the block took."""
+        return Timer(self, label) if ENABLED else contextlib.nullcontext()
+
+    def render(self):
+        with self.lock:
+            series = [(label, list(counts), self.sums[label]) for label, counts in sorted(self.counts.items())]
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for label, counts, total in series:
+            selector = f'{self.label}="{escape(label)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{selector},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{selector}}} {total:.6g}')
+            lines.append(f'{self.name}_count{{{selector}}} {cumulative}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def sample_lines(name, kind, description, values, label=None):
+    """Exposition lines of a gauge or counter; ``values`` maps label values to values when ``label`` is set."""
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+    if label is None:
+        values = {None: values}
+    for key, value in values.items():
+        if value is None:
+            continue
+        selector = f'{{{label}="{escape(key)}"}}' if label else ''
+        lines.append(f'{name}{selector} {value:.6g}' if isinstance(value, float) else f'{name}{selector} {value}')
+    return lines
+
+
+callback_seconds = Histogram('dashboard_callback_seconds', 'Chart callback run time, by tab, before serialization.',
+                             'callback', LATENCY_BUCKETS)
+stage_seconds = Histogram('dashboard_stage_seconds', 'Time in each step of a chart callback.', 'stage',
+                          LATENCY_BUCKETS)
+figure_seconds = Histogram('dashboard_figure_seconds', 'Time to build one figure, by graph id.', 'figure',
+                           LATENCY_BUCKETS)
+request_seconds = Histogram('dashboard_request_seconds', 'HTTP request time including serialization and compression, '
+                            'by URL rule.', 'route', LATENCY_BUCKETS)
+response_bytes = Histogram('dashboard_response_bytes', 'HTTP response body size as sent, by URL rule.', 'route',
+                           SIZE_BUCKETS)
+
+HISTOGRAMS = [callback_seconds, stage_seconds, figure_seconds, request_seconds, response_bytes]
+
+
+def route(request):
+    """The URL rule a request matched: a bounded label, unlike its path."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def start_request():
+    flask.g.metrics_start = time.perf_counter()
+
+
+def finish_request(response):
+    start = flask.g.pop('metrics_start', None)
+    if start is not None:
+        label = route(flask.request)
+        request_seconds.observe(label, time.perf_counter() - start)
+        size = response.calculate_content_length()
+        if size is not None:
+            response_bytes.observe(label, size)
+    return response
+
+
+def install(server, collect):
+    """Time every request of ``server`` and serve /metrics; ``collect()`` returns extra exposition lines."""
+    if not ENABLED:
+        return
+    server.before_request(start_request)
+    server.after_request(finish_request)
+
+    @server.route('/metrics')
+    def metrics():
+        lines = [line for histogram in HISTOGRAMS for line in histogram.render()] + collect()
+        return flask.Response('\n'.join(lines) + '\n', content_type=CONTENT_TYPE)
@@ -0,0 +1,153 @@
+"""Prerender every county's chart figures into precompressed JSON bundles.
+
+Each (county, tab) figure set is written as gzip- and brotli-compressed JSON,
+with a manifest recording the data version the bundles were rendered from (a
+hash of the data files and the rendering code). At runtime the app sends bundles
+as they are from /figures/, and computes figures live for anything missing from
+the bundles or rendered from other data or code. Callbacks always render live:
+that is faster than decompressing and parsing a bundle.
+
+Usage:
+    python prerender.py [--output Data/prerendered] [--workers N]
+"""
+import argparse
+import concurrent.futures
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+OUTPUT_DIR = os.path.join('Data', 'prerendered')
+MANIFEST = 'manifest.json'
+
+# Content-Encoding -> bundle file suffix, in order of preference
+ENCODINGS = {'br': '.json.br', 'gzip': '.json.gz'}
+
+
+def bundle_names(counties):
+    """County -> file-name-safe bundle name, e.g. 'New Hanover County' -> 'new-hanover-county'.
+
+    Names that differ only in case or punctuation ('McDowell County' and
+    'Mcdowell County') get a numeric suffix, in county order.
+    """
+    names = {}
+    for county in counties:
+        base = name = re.sub(r'[^a-z0-9]+', '-', county.lower()).strip('-')
+        n = 1
+        while name in names.values():
+            n += 1
+            name = f'{base}-{n}'
+        names[county] = name
+    return names
+
+
+def render_county(county, name, output_dir):
+    """Write every tab's bundles for one county; returns the bytes written per encoding."""
+    import app
+    import dataset
+    from plotly.io.json import to_json_plotly
+
+    sizes = {'json': 0, 'gzip': 0, 'br': 0}
+    view = app.filter_county(county)
+    for tab, graph_ids in app.TAB_GRAPHS.items():
+        payload = to_json_plotly(list(dataset.chart_renderer.figures(graph_ids, view))).encode()
+        path = os.path.join(output_dir, name, tab)
+        compressed = {'gzip': gzip.compress(payload, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(payload, quality=11)
+        for encoding, data in compressed.items():
+            with open(path + ENCODINGS[encoding], 'wb') as f:
+                f.write(data)
+            sizes[encoding] += len(data)
+        sizes['json'] += len(payload)
+    return sizes
+
+
+def prerender(output_dir=OUTPUT_DIR, workers=None):
+    """Render all bundles with a process pool and write the manifest last."""
+    import app
+    import dataset
+
+    names = bundle_names(dataset.counties)
+    for name in names.values():
+        os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    # Forked workers inherit the already-loaded app instead of loading the data again
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    totals = {'json': 0, 'gzip': 0, 'br': 0}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(render_county, county, name, output_dir) for county, name in names.items()]
+        for future in futures:
+            for encoding, size in future.result().items():
+                totals[encoding] += size
+
+    manifest = {
+        'version': dataset.figure_cache.version,
+        'tabs': list(app.TAB_GRAPHS),
+        'counties': names,
+        'encodings': [encoding for encoding in ENCODINGS if totals[encoding]],
+    }
+    with open(os.path.join(output_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest, totals
+
+
+class PrerenderedFigures:
+    """Read access to the bundles, if they match the current data version."""
+
+    def __init__(self, version, directory=OUTPUT_DIR):
+        self.directory = directory
+        self.counties = {}
+        self.encodings = []
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Bundles rendered from other data or code are stale; compute live instead
+        if manifest.get('version') == version:
+            self.counties = manifest['counties']
+            self.encodings = manifest['encodings']
+
+    def path(self, county, tab, encoding):
+        if county not in self.counties or encoding not in self.encodings:
+            return None
+        return os.path.join(self.directory, self.counties[county], tab + ENCODINGS[encoding])
+
+    def compressed(self, county, tab, accepted):
+        """The stored (bytes, encoding) of a bundle in the preferred accepted encoding, or None."""
+        for encoding in ENCODINGS:
+            path = self.path(county, tab, encoding)
+            if path and encoding in accepted:
+                try:
+                    with open(path, 'rb') as f:
+                        return f.read(), encoding
+                except OSError:
+                    return None
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=OUTPUT_DIR, help='directory to write the bundles to')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest, totals = prerender(args.output, args.workers)
+    print(f'Wrote {len(manifest["counties"]) * len(manifest["tabs"])} bundles to {args.output} '
+          f'in {time.perf_counter() - start:.2f}s')
+    for encoding in ['json'] + manifest['encodings']:
+        print(f'  {encoding:<5} {totals[encoding] / 2 ** 20:7.2f} MiB')
+    if brotli is None:
+        print('  brotli not installed; wrote gzip bundles only')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""On-demand profiling of a live instance's requests, behind an admin token.
+
+Off unless DASHBOARD_PROFILER_TOKEN is set; then GET /admin/profile with the
+header `Authorization: Bearer <token>` profiles the requests the process serves
+during the capture and returns the result as a file. Without the token no route
+or hook is installed, so requests pay nothing.
+
+Query parameters:
+    seconds   capture length (default 10, at most MAX_SECONDS)
+    calls     end the capture early after this many chart callbacks
+    mode      'sample' (default): the stacks of threads serving requests,
+              sampled every `interval` ms and returned as collapsed stacks for
+              flamegraph.pl or speedscope. 'cprofile': a deterministic profile
+              of every request, returned as a pstats file for
+              `python -m pstats` or snakeviz; slower while it runs. From
+              Python 3.12 cProfile hooks the whole process, so one profiler
+              runs for the capture and also records other threads (the
+              figure warm-up, if it is running).
+    interval  sampling interval in milliseconds (default 5, must be positive)
+
+Samples taken while ChartRenderer.figure builds a chart are labelled with its
+graph id (`figure[expenses-total]`), so each chart shows as its own flame.
+Each gunicorn worker profiles only itself, like /metrics.
+
+Environment:
+    DASHBOARD_PROFILER_TOKEN  token that enables /admin/profile (default: off)
+"""
+import collections
+import cProfile
+import hmac
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+
+import flask
+
+TOKEN = os.environ.get('DASHBOARD_PROFILER_TOKEN', '')
+
+MAX_SECONDS = 60
+
+# Functions whose samples are labelled with one of their locals
+LABELLED_FRAMES = {'figure': 'graph_id'}
+
+CALLBACK_PATH = '/_dash-update-component'
+
+# GIL switch interval while sampling, in seconds
+SAMPLE_SWITCH_INTERVAL = 0.0002
+
+# From Python 3.12 cProfile runs on sys.monitoring: one enabled profiler sees every thread,
+# and enabling a second, from any thread, raises ValueError
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def collapsed_stack(frame):
+    """'a;b;c' from the request's WSGI entry point down to ``frame``, or None if it isn't serving one."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        name = f'{os.path.basename(code.co_filename)}:{code.co_name}'
+        label = LABELLED_FRAMES.get(code.co_name)
+        if label is not None and label in frame.f_locals:
+            name += f'[{frame.f_locals[label]}]'
+        names.append(name)
+        if code.co_name == 'wsgi_app':
+            return ';'.join(reversed(names))
+        frame = frame.f_back
+    return None
+
+
+class Capture:
+    """One profiling session: its samples or profiles, and when it ends."""
+
+    def __init__(self, mode, seconds, calls, interval):
+        self.mode = mode
+        self.deadline = time.monotonic() + seconds
+        self.calls = calls
+        self.interval = interval
+        self.callbacks = 0
+        self.requests = 0
+        self.samples = collections.Counter()
+        self.stats = None
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def request_started(self):
+        if self.mode == 'cprofile' and not PROCESS_WIDE_CPROFILE:
+            # Before 3.12 a profiler only sees the thread that enabled it
+            flask.g.profile = cProfile.Profile()
+            flask.g.profile.enable()
+
+    def request_finished(self):
+        profile = flask.g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+        with self.lock:
+            if profile is not None:
+                self.add_stats(profile)
+            self.requests += 1
+            if flask.request.path.endswith(CALLBACK_PATH):
+                self.callbacks += 1
+                if self.calls and self.callbacks >= self.calls:
+                    self.finished.set()
+
+    def add_stats(self, profile):
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    def run(self):
+        """Wait out the capture, sampling request threads in sample mode; the calling thread isn't sampled.
+
+        Raises ValueError if a process-wide profile can't start because another
+        profiling tool is active.
+        """
+        own = threading.get_ident()
+        switch_interval = sys.getswitchinterval()
+        profile = None
+        if self.mode == 'sample':
+            # The sampler only runs when it gets the GIL; by default a busy request thread
+            # keeps it for 5 ms at a time, so samples would mostly land on I/O waits
+            sys.setswitchinterval(min(switch_interval, SAMPLE_SWITCH_INTERVAL))
+        elif PROCESS_WIDE_CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            self.collect(own)
+        finally:
+            sys.setswitchinterval(switch_interval)
+            if profile is not None:
+                profile.disable()
+                with self.lock:
+                    self.add_stats(profile)
+
+    def collect(self, own):
+        while not self.finished.is_set():
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self.mode == 'sample':
+                for thread_id, frame in sys._current_frames().items():
+                    stack = collapsed_stack(frame) if thread_id != own else None
+                    if stack is not None:
+                        with self.lock:
+                            self.samples[stack] += 1
+            self.finished.wait(min(self.interval, remaining) if self.mode == 'sample' else remaining)
+
+    def result(self):
+        """(body, file extension) of the capture."""
+        with self.lock:
+            if self.mode == 'cprofile':
+                return marshal.dumps(self.stats.stats if self.stats is not None else {}), 'pstats'
+            lines = [f'{stack} {count}' for stack, count in self.samples.most_common()]
+            return '\n'.join(lines) + '\n', 'collapsed'
+
+
+class Profiler:
+    """The /admin/profile route and the request hooks that feed the active capture."""
+
+    def __init__(self, token):
+        self.token = token
+        self.active = None
+        self.lock = threading.Lock()
+
+    def install(self, server):
+        server.before_request(self.start_request)
+        server.teardown_request(self.finish_request)
+        server.add_url_rule('/admin/profile', 'admin_profile', self.profile)
+
+    def start_request(self):
+        capture = self.active
+        if capture is not None and flask.request.path != '/admin/profile':
+            flask.g.capture = capture
+            capture.request_started()
+
+    def finish_request(self, exc):
+        capture = flask.g.pop('capture', None)
+        if capture is not None:
+            capture.request_finished()
+
+    def profile(self):
+        authorization = flask.request.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode(), f'Bearer {self.token}'.encode()):
+            return flask.Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'})
+        args = flask.request.args
+        mode = args.get('mode', 'sample')
+        if mode not in ('sample', 'cprofile'):
+            flask.abort(400, "mode must be 'sample' or 'cprofile'")
+        interval = args.get('interval', 5, type=float)
+        if not interval > 0:
+            flask.abort(400, 'interval must be positive')
+        capture = Capture(mode, min(args.get('seconds', 10, type=float), MAX_SECONDS),
+                          args.get('calls', 0, type=int), interval / 1000)
+        with self.lock:
+            if self.active is not None:
+                return flask.Response('A capture is already running\n', 409)
+            self.active = capture
+        try:
+            capture.run()
+        except ValueError as error:
+            return flask.Response(f'{error}\n', 409)
+        finally:
+            self.active = None
+        body, extension = capture.result()
+        response = flask.Response(body, mimetype='application/octet-stream' if mode == 'cprofile' else 'text/plain')
+        response.headers['Content-Disposition'] = f'attachment; filename=profile-{int(time.time())}.{extension}'
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['X-Profile-Requests'] = str(capture.requests)
+        return response
+
+
+def install(server, token=TOKEN):
+    """Serve /admin/profile on ``server`` if a token is configured; otherwise do nothing."""
+    if token:
+        Profiler(token).install(server)
@@ -0,0 +1,91 @@
+"""Statewide rank and percentile of every county, for every metric and year in the metric cube.
+
+Computed once per data version, in one vectorized pass over the cube's county
+axis: two sorts of every (year, metric) column give each county how many counties
+report a higher and a lower value, hence its rank (1 is the highest, ties share
+the better rank) and percentile (the share of the other reporting counties with
+a lower value). Counties with no finite value for a year aren't ranked. The
+chart annotations and the ranking table only look values up.
+"""
+import numpy as np
+
+
+def count_smaller(keys):
+    """For every element, how many elements of its row (last axis) have a strictly smaller key."""
+    # Ties are handled below, so the sort needn't be stable
+    order = np.argsort(keys, axis=-1)
+    # Flat indexes of each row's elements in sorted order; much faster than take/put_along_axis
+    flat = (order + np.arange(0, keys.size, keys.shape[-1]).reshape(keys.shape[:-1] + (1,))).ravel()
+    ordered = keys.ravel()[flat].reshape(keys.shape)
+    # Each element's position, zeroed where it repeats the previous key, then carried forward
+    # over the run of equal keys: the position where that run starts
+    starts = np.where(ordered[..., 1:] != ordered[..., :-1], np.arange(1, keys.shape[-1]), 0)
+    counts = np.empty(keys.size, dtype='int64')
+    counts[flat] = np.maximum.accumulate(np.concatenate([np.zeros_like(starts[..., :1]), starts], axis=-1),
+                                         axis=-1).ravel()
+    return counts.reshape(keys.shape)
+
+
+def ordinal(n):
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f'{n}{suffix}'
+
+
+class Rankings:
+    """ranks[year - first_year, metric_id, county_id] (0 if unranked) and matching percentiles.
+
+    Stored with counties last, so one (year, metric) column is a contiguous row.
+    """
+
+    def __init__(self, cube, labels):
+        self.cube = cube
+        # Metric -> display name of the metrics offered in the ranking table
+        self.labels = {metric: label for metric, label in labels.items() if metric in cube.metric_index}
+        values = np.ascontiguousarray(np.moveaxis(cube.values, 0, -1))
+        finite = np.isfinite(values)
+        # Unreported values sort after every reported one, so they don't change the counts
+        higher = count_smaller(np.where(finite, -values, np.inf))
+        lower = count_smaller(np.where(finite, values, np.inf))
+        self.counts = finite.sum(axis=-1)
+        self.ranks = np.where(finite, higher + 1, 0).astype('int16')
+        counts = self.counts[..., np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.percentiles = np.where(finite & (counts > 1), 100 * lower / (counts - 1), np.nan).astype('float32')
+        # Latest year index each county reports each metric for, or -1
+        self.latest = np.where(finite.any(axis=0), len(cube.years) - 1 - np.argmax(finite[::-1], axis=0), -1)
+
+    def year_index(self, year):
+        """Position of ``year`` on the cube's year axis; KeyError for years outside it."""
+        y = int(year) - int(self.cube.years[0])
+        if not 0 <= y < len(self.cube.years):
+            raise KeyError(year)
+        return y
+
+    def years(self, metric):
+        """Years at least two counties report ``metric`` for, latest first."""
+        counts = self.counts[:, self.cube.metric_index[metric]]
+        return [int(year) for year in self.cube.years[counts > 1][::-1]]
+
+    def latest_year(self, county, metric):
+        """The latest year ``county`` reports ``metric`` for, or None."""
+        index = self.latest[self.cube.metric_index[metric], self.cube.county_index[county]]
+        return int(self.cube.years[index]) if index >= 0 else None
+
+    def position(self, county, metric, year):
+        """(rank, counties ranked, percentile) of a county, or None if it isn't ranked."""
+        y, m, c = self.year_index(year), self.cube.metric_index[metric], self.cube.county_index[county]
+        percentile = self.percentiles[y, m, c]
+        if not self.ranks[y, m, c] or np.isnan(percentile):
+            return None
+        return int(self.ranks[y, m, c]), int(self.counts[y, m]), float(percentile)
+
+    def table(self, metric, year):
+        """Every ranked county for a metric and year, as rows in rank order."""
+        y, m = self.year_index(year), self.cube.metric_index[metric]
+        ranks, values, percentiles = self.ranks[y, m], self.cube.values[:, y, m], self.percentiles[y, m]
+        ranked = np.flatnonzero(ranks)
+        return [
+            {'rank': int(ranks[c]), 'county': self.cube.counties[c], 'value': float(values[c]),
+             'percentile': round(float(percentiles[c]), 1)}
+            for c in ranked[np.argsort(ranks[ranked], kind='stable')]
+        ]
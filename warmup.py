@@ -0,0 +1,106 @@
+"""Background precomputation of every county's figures, ahead of their first visitor.
+
+A small thread pool works through (county, tab) keys in priority order and
+fills the figure cache. Live requests come first: the pool only takes the next
+key while no request is in flight and none has finished within the last
+WARMUP_BACKOFF seconds, so warm-up never competes with a visitor for the GIL
+for longer than one key. progress() backs the /readyz endpoint.
+
+Environment:
+    DASHBOARD_WARMUP_THREADS  warm-up threads per process (default 2, 0 disables warm-up)
+"""
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+import traceback
+
+WARMUP_THREADS = int(os.environ.get('DASHBOARD_WARMUP_THREADS', 2))
+
+# Quiet period after a live request before warm-up resumes, in seconds
+WARMUP_BACKOFF = 0.05
+
+
+class Warmup:
+    """Thread pool that computes keys while the server is otherwise idle."""
+
+    def __init__(self, threads=WARMUP_THREADS, backoff=WARMUP_BACKOFF):
+        self.threads = threads
+        self.backoff = backoff
+        self.pending = collections.deque()
+        self.total = None
+        self.done = 0
+        self.failed = 0
+        self.live = 0
+        self.last_live = 0.0
+        self.started = None
+        self.finished = None
+        self.idle = threading.Condition()
+        self.pool = None
+
+    def start(self, keys, compute):
+        """Compute ``compute(*key)`` for every key, in order, on the pool."""
+        with self.idle:
+            if self.total is not None:
+                return
+            # With no threads warm-up is off, and the process is ready as soon as it starts
+            self.pending.extend(keys if self.threads else [])
+            self.total = len(self.pending)
+            self.started = time.time()
+            if not self.pending:
+                self.finished = self.started
+                return
+        self.pool = concurrent.futures.ThreadPoolExecutor(self.threads, thread_name_prefix='figure-warmup')
+        for _ in range(self.threads):
+            self.pool.submit(self.run, compute)
+
+    def run(self, compute):
+        while True:
+            key = self.next_key()
+            if key is None:
+                return
+            try:
+                compute(*key)
+            except Exception:
+                # A key that fails here fails again, visibly, when it's requested
+                traceback.print_exc()
+                with self.idle:
+                    self.failed += 1
+            with self.idle:
+                self.done += 1
+                if self.done == self.total:
+                    self.finished = time.time()
+
+    def next_key(self):
+        """The next key once the server is idle, or None when the queue is empty."""
+        with self.idle:
+            while self.pending:
+                quiet = time.monotonic() - self.last_live
+                if not self.live and quiet >= self.backoff:
+                    return self.pending.popleft()
+                self.idle.wait(None if self.live else self.backoff - quiet)
+            return None
+
+    def request_started(self):
+        with self.idle:
+            self.live += 1
+
+    def request_finished(self):
+        with self.idle:
+            self.live -= 1
+            self.last_live = time.monotonic()
+            self.idle.notify_all()
+
+    def progress(self):
+        """Warm-up state: whether it's started and done, and how many keys are computed."""
+        with self.idle:
+            ready = self.total is not None and self.done == self.total
+            return {
+                'ready': ready,
+                'started': self.total is not None,
+                'done': self.done,
+                'total': self.total,
+                'failed': self.failed,
+                'seconds': round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            }
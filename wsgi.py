@@ -0,0 +1,20 @@
+"""WSGI entry point for production serving.
+
+With gunicorn's preload_app (see gunicorn.conf.py) this module is imported once
+in the master process: the dataset is loaded and preprocessed there and the
+forked workers share those pages copy-on-write instead of each holding a copy.
+In lazy mode (DASHBOARD_LAZY=1) nothing is loaded here; each worker loads the
+dataset after it starts (see gunicorn.conf.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+"""
+import gc
+
+from app import app
+
+server = app.server
+
+# Move everything loaded so far out of the collector's generations, so garbage
+# collection in the workers doesn't write to (and un-share) the master's pages
+gc.collect()
+gc.freeze()